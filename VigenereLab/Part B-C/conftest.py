@@ -0,0 +1 @@
+# Lets pytest, run from this directory, import the vigenere package the same way b1.py and b2.py do
@@ -0,0 +1,60 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from vigenere.codec import decrypt_stream, encrypt_stream, vigenere_decrypt, vigenere_encrypt
+from vigenere.ic_engine import swedish_alphabet
+
+PART_A_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "Part A")
+
+# Letters, and characters outside the alphabet that keep their place and use up a key position
+TEXT = "Hejsan, världen!\nDet här är en text med å, ä och ö som ska tillbaka oförändrad. 12345 é"
+
+
+def read_part_a(extension):
+    with open(os.path.join(PART_A_DIRECTORY, f"vig_group12.{extension}"), encoding="utf-8") as partReader:
+        return partReader.read()
+
+
+def test_part_a_ciphertext_reproduced():
+    plaintext, key, ciphertext = read_part_a("plain"), read_part_a("key").strip(), read_part_a("crypto")
+    assert vigenere_encrypt(plaintext, key) == ciphertext
+    assert vigenere_decrypt(ciphertext, key) == plaintext
+
+
+@pytest.mark.parametrize("key", ["a", "ö", "tjolahopp", "smärtfritt"])
+@pytest.mark.parametrize("offset", [0, 3])
+def test_decrypt_inverts_encrypt(key, offset):
+    ciphertext = vigenere_encrypt(TEXT, key, offset)
+    assert len(ciphertext) == len(TEXT)
+    assert vigenere_decrypt(ciphertext, key, offset) == TEXT
+
+
+def test_random_letters_round_trip():
+    rng = np.random.default_rng(0)
+    plaintext = "".join(rng.choice(list(swedish_alphabet), 1000))
+    key = "".join(rng.choice(list(swedish_alphabet), 17))
+    assert vigenere_decrypt(vigenere_encrypt(plaintext, key), key) == plaintext
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 29, 64, 10000])
+def test_stream_matches_bulk(chunk_size):
+    key = "tjolahopp"
+    ciphertext = vigenere_encrypt(TEXT, key, 2)
+    writer = io.StringIO()
+    offset = encrypt_stream(io.StringIO(TEXT), writer, key, 2, chunk_size)
+    assert writer.getvalue() == ciphertext
+    assert offset == (2 + len(TEXT)) % len(key)
+
+    writer = io.StringIO()
+    decrypt_stream(io.StringIO(ciphertext), writer, key, 2, chunk_size)
+    assert writer.getvalue() == TEXT
+
+
+def test_invalid_key_rejected():
+    with pytest.raises(ValueError):
+        vigenere_encrypt(TEXT, "")
+    with pytest.raises(ValueError):
+        vigenere_encrypt(TEXT, "abc1")
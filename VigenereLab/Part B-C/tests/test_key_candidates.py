@@ -0,0 +1,40 @@
+import itertools
+
+import numpy as np
+
+from vigenere.ic_engine import ALPHABET_SIZE
+from vigenere.key_candidates import k_best_keys, k_best_shifts
+from vigenere.shift_solver import shifts_to_key
+
+
+def brute_force(scores):
+    """
+    Every combination of shifts with its total, the best first.
+    """
+    combinations = [(sum(scores[j, shift] for j, shift in enumerate(shifts)), list(shifts))
+                    for shifts in itertools.product(range(ALPHABET_SIZE), repeat=len(scores))]
+    return sorted(combinations)
+
+
+def test_k_best_shifts_matches_brute_force():
+    scores = np.random.default_rng(0).random((3, ALPHABET_SIZE))
+    enumerated = list(k_best_shifts(scores))
+    expected = brute_force(scores)
+
+    assert len(enumerated) == ALPHABET_SIZE ** 3
+    assert [shifts for _, shifts in enumerated] == [shifts for _, shifts in expected]
+    assert np.allclose([total for total, _ in enumerated], [total for total, _ in expected])
+
+
+def test_k_best_shifts_ignores_positions_without_letters():
+    scores = np.random.default_rng(1).random((2, ALPHABET_SIZE))
+    scores[1] = np.nan
+    totals = [total for total, _ in itertools.islice(k_best_shifts(scores), ALPHABET_SIZE)]
+    assert np.allclose(totals, scores[0].min())
+
+
+def test_k_best_keys_starts_with_the_best_shifts():
+    scores = np.random.default_rng(2).random((5, ALPHABET_SIZE))
+    total, key = next(k_best_keys(scores))
+    assert key == shifts_to_key(scores.argmin(axis=1))
+    assert np.isclose(total, scores.min(axis=1).sum())
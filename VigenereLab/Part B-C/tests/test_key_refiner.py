@@ -0,0 +1,40 @@
+import os
+
+from vigenere.codec import vigenere_decrypt
+from vigenere.ic_engine import CipherText
+from vigenere.key_refiner import refine_key
+from vigenere.lab import reconstruct_key, split_segments
+from vigenere.language_profile import corpus_path
+
+PART_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir)
+PART_A_DIRECTORY = os.path.join(PART_DIRECTORY, os.pardir, "Part A")
+
+
+def read_part_a(extension):
+    with open(os.path.join(PART_A_DIRECTORY, f"vig_group12.{extension}"), encoding="utf-8") as partReader:
+        return partReader.read()
+
+
+def test_refine_key_fixes_the_chi_square_key():
+    # The chi-square test gets one letter of this key wrong, which the quadgram score corrects
+    ciphertext = CipherText.from_file(os.path.join(PART_DIRECTORY, "ciphertexts (short key)", "vig_group10.crypto"))
+    reconstructed = reconstruct_key(split_segments(ciphertext, 10))
+    assert reconstructed == "smärtfsitt"
+    assert refine_key(ciphertext, reconstructed) == "smärtfritt"
+
+
+def test_refine_key_recovers_the_part_a_key():
+    plaintext, key, ciphertext = read_part_a("plain"), read_part_a("key").strip(), read_part_a("crypto")
+    for start in (key, "tjolahopa", "ajolahopp", "tjolbhopp"):
+        refined = refine_key(ciphertext, start)
+        assert refined == key
+        assert vigenere_decrypt(ciphertext, refined) == plaintext
+
+
+def test_corpus_holds_no_lab_plaintext():
+    # Training on the answers would make the tests above circular
+    with open(corpus_path("swedish"), encoding="utf-8") as corpusReader:
+        corpus = corpusReader.read()
+    plaintext = read_part_a("plain")
+    for start in range(0, len(plaintext) - 40, 20):
+        assert plaintext[start:start + 40] not in corpus
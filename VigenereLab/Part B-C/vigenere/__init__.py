@@ -0,0 +1,65 @@
+"""
+Cryptanalysis of the modified Vigenère cipher over the 29 letter Swedish alphabet.
+
+Importing the package does no work: every name below is only imported from its submodule the first time it is
+used, and the command line modules import argparse only when run.
+"""
+import importlib
+
+# The submodule defining every name exported by the package
+_EXPORTS = {
+    "swedish_alphabet": "ic_engine",
+    "encode": "ic_engine",
+    "CipherText": "ic_engine",
+    "ic_curve": "ic_engine",
+    "closest_key_length": "ic_engine",
+    "ranked_key_lengths": "ic_engine",
+    "KeyLengthAccumulator": "ic_engine",
+    "segment_histograms": "shift_solver",
+    "column_histograms": "shift_solver",
+    "shift_scores": "shift_solver",
+    "best_shifts": "shift_solver",
+    "shifts_to_key": "shift_solver",
+    "vigenere_encrypt": "codec",
+    "vigenere_decrypt": "codec",
+    "encrypt_stream": "codec",
+    "decrypt_stream": "codec",
+    "refine_key": "key_refiner",
+    "candidate_lattice": "key_candidates",
+    "k_best_keys": "key_candidates",
+    "first_accepted_key": "key_candidates",
+    "quadgram_acceptor": "key_candidates",
+    "crib_fragments": "crib_search",
+    "crib_agreements": "crib_search",
+    "pin_key": "crib_search",
+    "rank_periods": "period_detector",
+    "running_key_decode": "running_key",
+    "LanguageProfile": "language_profile",
+    "load_profile": "language_profile",
+    "select_profile": "language_profile",
+    "crack": "batch_crack",
+    "crack_files": "batch_crack",
+    "crack_batch": "batch_crack",
+    "CrackingService": "service",
+    "crack_remote": "service",
+    "friedman_test": "lab",
+    "shared_friedman_test": "lab",
+    "split_segments": "lab",
+    "text_sharpener": "lab",
+    "calculate_shifts": "lab",
+    "reconstruct_key": "lab",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
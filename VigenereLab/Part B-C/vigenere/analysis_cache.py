@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .ic_engine import CipherText, encode, ic_curve
+from .instrumentation import count, stage
+from .shift_solver import SWEDISH_FREQUENCIES, column_histograms, segment_histograms, shift_scores
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_MAX_BYTES = 64 << 20
+
+# Part of every cache key, increased whenever an analysis changes its results so the old entries are not used
+CACHE_VERSION = 1
+
+
+def cache_key(kind, texts, **parameters):
+    """
+    Address an analysis result by its content.
+
+    :param kind: The name of the analysis, e.g. "ic_curve".
+    :param texts: The texts it was run on, in order, as strings, CipherTexts or arrays of codes.
+    :param parameters: The parameters it was run with. Arrays are hashed by their values.
+    :return: The hex SHA-256 digest of the kind, the parameters and the alphabet indices of the texts. The
+        analyses skip the characters outside the alphabet, so they are hashed alike.
+    """
+    digest = hashlib.sha256(f"{CACHE_VERSION}:{kind}:".encode())
+    digest.update(json.dumps(parameters, sort_keys=True, default=lambda value: np.asarray(value).tolist()).encode())
+    for text in texts:
+        data = np.ascontiguousarray(encode(text)).tobytes()
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Results of the analyses stored on disk as one .npy file per result, named by its cache_key.
+
+    Reading an entry touches its modification time, and when the files grow over max_bytes the least recently
+    used ones are deleted. Entries are written to a temporary file first and renamed, so worker processes can
+    share a cache directory.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param directory: The directory of the entries, created if missing.
+        :param max_bytes: The size the entries are evicted down to.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        """
+        :param key: The cache_key of the entry.
+        :return: The stored array, or None if it is not in the cache.
+        """
+        path = self._path(key)
+        try:
+            value = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError):
+            count("cache_misses")
+            return None
+        count("cache_hits")
+        return value
+
+    def put(self, key, value):
+        """
+        Store an array, evicting the least recently used entries if the cache gets too big.
+
+        :param key: The cache_key of the entry.
+        :param value: An array, or anything np.asarray turns into one without pickling, e.g. a string.
+        """
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as entryWriter:
+            np.save(entryWriter, np.asarray(value), allow_pickle=False)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def memoize(self, kind, texts, compute, **parameters):
+        """
+        Look up an analysis, running it on a miss. The lookup is the instrumentation stage cache_<kind>, which holds
+        the cache_hits and cache_misses counters.
+
+        :param kind: The name of the analysis.
+        :param texts: The texts it is run on.
+        :param compute: A function without arguments running the analysis.
+        :param parameters: The parameters of the analysis.
+        :return: The cached result, or the result of compute, which is then stored.
+        """
+        with stage(f"cache_{kind}", texts=len(texts)):
+            key = cache_key(kind, texts, **parameters)
+            value = self.get(key)
+            if value is None:
+                value = np.asarray(compute())
+                self.put(key, value)
+        return value
+
+    def memoize_key(self, kind, texts, compute, **parameters):
+        """
+        Same as memoize, for analyses returning a key.
+
+        :return: The key.
+        """
+        return str(self.memoize(kind, texts, compute, **parameters))
+
+    def entries(self):
+        """
+        :return: A list of (last use, size, path) tuples, the least recently used first.
+        """
+        entries = []
+        with os.scandir(self.directory) as scanner:
+            for entry in scanner:
+                if entry.name.endswith(".npy"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def ic_curve(self, ciphertexts, key_lengths=range(1, 17), pooled=False):
+        """
+        Cached version of ic_engine.ic_curve.
+
+        Every ciphertext, or every pooled group of ciphertexts, has one entry holding all the key lengths
+        calculated so far. Only the key lengths missing from it are calculated, so widening the range reuses
+        the earlier ones. The lookup is the instrumentation stage cache_ic_curve.
+
+        :return: The same array as ic_engine.ic_curve.
+        """
+        single = isinstance(ciphertexts, (str, CipherText))
+        if single:
+            ciphertexts = [ciphertexts]
+        key_lengths = np.asarray(key_lengths, dtype=np.int64)
+
+        groups = [ciphertexts] if pooled else [[ciphertext] for ciphertext in ciphertexts]
+        with stage("cache_ic_curve", texts=len(ciphertexts), key_lengths=len(key_lengths)):
+            curves = np.array([self._group_curve(group, key_lengths) for group in groups]).reshape(len(groups),
+                                                                                                 len(key_lengths))
+        if single or pooled:
+            return curves[0]
+        return curves
+
+    def _group_curve(self, ciphertexts, key_lengths):
+        key = cache_key("ic_curve", ciphertexts)
+        cached = self.get(key)
+        # The entry holds the calculated key lengths in its first row and their average IC in its second
+        known = {} if cached is None else dict(zip(cached[0].astype(np.int64).tolist(), cached[1].tolist()))
+
+        missing = np.unique([length for length in key_lengths.tolist() if length not in known]).astype(np.int64)
+        if len(missing):
+            count("ic_lengths_computed", len(missing))
+            known.update(zip(missing.tolist(), ic_curve(ciphertexts, missing, pooled=True).tolist()))
+            lengths = sorted(known)
+            self.put(key, np.array([lengths, [known[length] for length in lengths]], dtype=np.float64))
+        return [known[length] for length in key_lengths.tolist()]
+
+    def shift_scores(self, ciphertext, key_length, expected_frequencies=SWEDISH_FREQUENCIES):
+        """
+        Cached chi-square score matrix of the columns of a ciphertext, see shift_solver.shift_scores.
+        """
+        return self.memoize("shift_scores", [ciphertext],
+                            lambda: shift_scores(column_histograms(ciphertext, key_length), expected_frequencies),
+                            key_length=key_length, expected_frequencies=expected_frequencies)
+
+    def segment_scores(self, segment_list, expected_frequencies=SWEDISH_FREQUENCIES):
+        """
+        Cached chi-square score matrix of already split segments, see shift_solver.shift_scores.
+        """
+        return self.memoize("segment_scores", segment_list,
+                            lambda: shift_scores(segment_histograms(segment_list), expected_frequencies),
+                            expected_frequencies=expected_frequencies)
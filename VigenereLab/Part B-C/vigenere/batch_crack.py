@@ -0,0 +1,265 @@
+import os
+from time import perf_counter
+
+import numpy as np
+
+from . import instrumentation
+from .codec import vigenere_decrypt
+from .ic_engine import ALPHABET_SIZE, CipherText, ic_curve, ranked_key_lengths
+from .key_refiner import refine_key
+from .language_profile import available_languages, load_profile, select_profile
+from .period_detector import rank_periods
+from .shift_solver import best_shifts, column_histograms, shift_scores, shifts_to_key
+
+# The index of coincidence of uniformly random letters
+RANDOM_IC = 1 / ALPHABET_SIZE
+
+
+def find_ciphertexts(patterns):
+    """
+    Expand directories and glob patterns into a list of ciphertext files.
+
+    :param patterns: Directories (all their .crypto files are taken), glob patterns or file names.
+    :return: The sorted file names, without duplicates.
+    """
+    import glob
+
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(glob.escape(pattern), "*.crypto")))
+        else:
+            paths.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(paths)
+
+
+def key_length_confidence(average_ic, swedish_ic=None):
+    """
+    How much the columns look like Swedish text rather than random letters, between 0 and 1.
+
+    :param average_ic: The average IC of the columns for the estimated key length.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    confidence = (average_ic - RANDOM_IC) / (swedish_ic - RANDOM_IC)
+    return min(1.0, max(0.0, confidence))
+
+
+def crack(ciphertext, key_lengths=range(1, 17), swedish_ic=None, refine=True, cache=None, languages=None):
+    """
+    Estimate the key length, reconstruct the key and decrypt a ciphertext.
+
+    The key length is estimated with the IC of the Swedish profile. The language profile that fits the ciphertext
+    best is then picked with select_profile, and its letter frequencies and quadgram table reconstruct and refine
+    the key.
+
+    :param ciphertext: The ciphertext to break, as a string or a CipherText.
+    :param key_lengths: The candidate key lengths, or None to search every period with the autocorrelation.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param refine: If True, the chi-square key is refined by quadgram hill-climbing.
+    :param cache: An AnalysisCache to reuse the IC curve, the chi-square scores and the key of earlier runs.
+    :param languages: The candidate languages (default: all the languages with a corpus).
+    :return: A dict with the estimated key length, the language, the key, the confidence and the plaintext.
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    if key_lengths is None:
+        ranking = [(period, column_ic) for period, _, _, column_ic in rank_periods(ciphertext, swedish_ic=swedish_ic)]
+    else:
+        curve = ic_curve(ciphertext, key_lengths) if cache is None else cache.ic_curve(ciphertext, key_lengths)
+        ranking = ranked_key_lengths(curve, key_lengths, swedish_ic)
+    if not ranking:
+        raise ValueError("The ciphertext is too short for the candidate key lengths")
+    key_length, average_ic = ranking[0]
+
+    profile = select_profile(ciphertext, key_length, languages)
+    frequencies = np.asarray(profile.unigram, dtype=np.float64)
+    if cache is None:
+        scores = shift_scores(column_histograms(ciphertext, key_length), frequencies)
+    else:
+        scores = cache.shift_scores(ciphertext, key_length, frequencies)
+    key = shifts_to_key(best_shifts(scores))
+    if refine:
+        if cache is None:
+            key = refine_key(ciphertext, key, profile.quadgram)
+        else:
+            # The profile fingerprint keeps a profile rebuilt from a changed corpus from reusing the old keys
+            key = cache.memoize_key("refined_key", [ciphertext], lambda: refine_key(ciphertext, key, profile.quadgram),
+                                    key=key, language=profile.language, profile=profile.fingerprint)
+    return {
+        "key_length": key_length,
+        "language": profile.language,
+        "key": key,
+        "confidence": round(key_length_confidence(average_ic, swedish_ic), 4),
+        "plaintext": vigenere_decrypt(ciphertext, key),
+    }
+
+
+def crack_batch(ciphertexts, key_lengths=range(1, 17), swedish_ic=None, refine=True, languages=None):
+    """
+    Break many ciphertexts together, e.g. the requests of a micro-batch.
+
+    The IC curves of all the ciphertexts are one ic_curve call and the chi-square scores of all their columns one
+    shift_scores call per language. Only the profile selection, the refinement and the decryption run per
+    ciphertext.
+
+    :param ciphertexts: The ciphertexts to break, as strings or CipherTexts.
+    :param key_lengths: The candidate key lengths.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param refine: If True, the chi-square keys are refined by quadgram hill-climbing.
+    :param languages: The candidate languages (default: all the languages with a corpus).
+    :return: A list with the record of every ciphertext as returned by crack, or a ValueError for the ones too short
+        for the candidate key lengths.
+    """
+    ciphertexts = [ciphertext if isinstance(ciphertext, CipherText) else CipherText(ciphertext)
+                   for ciphertext in ciphertexts]
+    if not ciphertexts:
+        return []
+
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+
+    with instrumentation.stage("crack_batch", texts=len(ciphertexts)):
+        curves = ic_curve(ciphertexts, key_lengths)
+        rankings = [ranked_key_lengths(curve, key_lengths, swedish_ic) for curve in curves]
+        solvable = [i for i, ranking in enumerate(rankings) if ranking]
+
+        profiles = {i: select_profile(ciphertexts[i], rankings[i][0][0], languages) for i in solvable}
+        by_language = {}
+        for i in solvable:
+            by_language.setdefault(profiles[i].language, []).append(i)
+        keys = {}
+        for language, indices in by_language.items():
+            histograms = [column_histograms(ciphertexts[i], rankings[i][0][0]) for i in indices]
+            shifts = best_shifts(shift_scores(np.concatenate(histograms),
+                                              np.asarray(profiles[indices[0]].unigram, dtype=np.float64)))
+            start = 0
+            for i in indices:
+                key_length = rankings[i][0][0]
+                keys[i] = shifts_to_key(shifts[start:start + key_length])
+                start += key_length
+
+        results = [ValueError("The ciphertext is too short for the candidate key lengths")] * len(ciphertexts)
+        for i in solvable:
+            key_length, average_ic = rankings[i][0]
+            key = keys[i]
+            if refine:
+                key = refine_key(ciphertexts[i], key, profiles[i].quadgram)
+            results[i] = {
+                "key_length": key_length,
+                "language": profiles[i].language,
+                "key": key,
+                "confidence": round(key_length_confidence(average_ic, swedish_ic), 4),
+                "plaintext": vigenere_decrypt(ciphertexts[i], key),
+            }
+        return results
+
+
+def crack_file(job):
+    """
+    Break the ciphertext of a file. Runs in a worker process.
+
+    :param job: A (path, key lengths, swedish_ic, languages, trace origin, cache) tuple. If the trace origin is not
+        None, the stages are recorded against it. The cache is an AnalysisCache or None.
+    :return: The record of the file, with an "error" field instead of the results if it could not be broken, and
+        the recorded events under "events" when tracing.
+    """
+    path, key_lengths, swedish_ic, languages, trace_origin, cache = job
+    if trace_origin is None:
+        return _crack_path(path, key_lengths, swedish_ic, languages, cache)
+
+    with instrumentation.recording(trace_origin) as recorder, instrumentation.job(path):
+        record = _crack_path(path, key_lengths, swedish_ic, languages, cache)
+    for event in recorder.events:
+        event["pid"] = os.getpid()
+    return {**record, "events": recorder.events}
+
+
+def _crack_path(path, key_lengths, swedish_ic, languages, cache):
+    try:
+        # Decoded and encoded once, every stage below reuses the same buffer
+        with instrumentation.stage("read_file"):
+            ciphertext = CipherText.from_file(path)
+            instrumentation.count("characters", len(ciphertext))
+        return {"file": path, **crack(ciphertext, key_lengths, swedish_ic, cache=cache, languages=languages)}
+    except (OSError, UnicodeDecodeError, ValueError) as error:
+        return {"file": path, "error": str(error)}
+
+
+def crack_files(paths, key_lengths=range(1, 17), swedish_ic=None, workers=None, chunksize=1, trace=False,
+                cache=None, languages=None):
+    """
+    Break many ciphertext files on a process pool.
+
+    :param paths: The ciphertext files.
+    :param key_lengths: The candidate key lengths.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param workers: The number of worker processes (default: number of CPUs).
+    :param chunksize: The number of files sent to a worker at a time.
+    :param trace: If True, every record carries the instrumentation events of its file under "events".
+    :param cache: An AnalysisCache shared by the workers, or None.
+    :param languages: The candidate languages (default: all the languages with a corpus).
+    :return: A generator of records, in the order the workers finish them.
+    """
+    from multiprocessing import Pool
+
+    trace_origin = perf_counter() if trace else None
+    jobs = [(path, key_lengths, swedish_ic, languages, trace_origin, cache) for path in paths]
+    # Building the profile files once here, the workers then only map them
+    for language in languages or available_languages():
+        load_profile(language)
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(crack_file, jobs, chunksize=chunksize)
+
+
+def main():
+    import argparse
+    import json
+    import sys
+
+    from .cli import add_cache_arguments, open_cache
+
+    parser = argparse.ArgumentParser(description="Break every ciphertext of a directory or glob pattern in parallel.")
+    parser.add_argument("patterns", nargs="+", help="directories of .crypto files, glob patterns or files")
+    parser.add_argument("--min-length", type=int, default=1, help="shortest candidate key length (default 1)")
+    parser.add_argument("--max-length", type=int, default=16, help="longest candidate key length (default 16)")
+    parser.add_argument("--all-periods", action="store_true",
+                        help="search every period up to the text length with the autocorrelation detector")
+    parser.add_argument("--swedish-ic", type=float, default=None,
+                        help="index of coincidence of the language (default: the one of the Swedish profile)")
+    parser.add_argument("--language", action="append", default=None,
+                        help="candidate language profile, repeatable (default: every language with a corpus)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--chunksize", type=int, default=1, help="files sent to a worker at a time")
+    parser.add_argument("--output", default="-", help="JSON lines file to write (default: standard output)")
+    parser.add_argument("--trace", default=None,
+                        help="file to write the per-stage instrumentation to: .trace.json for a Chrome trace, "
+                             ".folded for flame graph stacks, any other name for JSON events")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    paths = find_ciphertexts(args.patterns)
+    key_lengths = None if args.all_periods else range(args.min_length, args.max_length + 1)
+
+    events = []
+    writer = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for record in crack_files(paths, key_lengths, args.swedish_ic, args.workers, args.chunksize,
+                                  args.trace is not None, open_cache(args), args.language):
+            if "events" in record:
+                record_events = record.pop("events")
+                record["stages"] = instrumentation.summarize(record_events)
+                events.extend(record_events)
+            writer.write(json.dumps(record, ensure_ascii=False) + "\n")
+            writer.flush()
+    finally:
+        if writer is not sys.stdout:
+            writer.close()
+
+    if args.trace is not None:
+        instrumentation.write_trace(events, args.trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from .codec import vigenere_decrypt, vigenere_encrypt
+from .ic_engine import swedish_alphabet
+from .key_refiner import refine_key
+from .lab import calculate_shifts, friedman_test, reconstruct_key, split_segments
+from .language_profile import PUBLISHED_FREQUENCIES, PUBLISHED_ICS, available_languages, build_profile, corpus_path
+from .period_detector import rank_periods
+
+DEFAULT_TEXT_LENGTHS = [200, 400, 800, 1600]
+DEFAULT_KEY_LENGTHS = [4, 8, 12, 16]
+# Every HOLDOUT_EVERY-th paragraph of a corpus is held out of the benchmark profile and used for the samples
+HOLDOUT_EVERY = 5
+
+# Accuracies that must not drop and stage times that must not grow when comparing with a baseline
+ACCURACY_FIELDS = ["key_length_accuracy", "period_detector_accuracy", "key_letter_accuracy",
+                   "refined_key_letter_accuracy", "exact_key_rate"]
+
+
+def split_corpus(language, holdout_every=HOLDOUT_EVERY):
+    """
+    Split the corpus of a language into the paragraphs the benchmark profile is trained on and the held-out ones
+    the samples are cut from, so the refined key accuracy measures how the quadgram model generalizes instead of
+    how well it remembers its training text.
+
+    :param language: The name of the language.
+    :param holdout_every: Every holdout_every-th paragraph, starting with the first, is held out.
+    :return: A (training paragraphs, held-out letters) pair, the held-out letters as one string.
+    """
+    with open(corpus_path(language), encoding="utf-8") as corpusReader:
+        paragraphs = corpusReader.read().split()
+    if len(paragraphs) < 2:
+        raise ValueError(f"The {language} corpus needs at least two paragraphs to hold one out")
+    held_out = "".join(paragraphs[::holdout_every])
+    training = [paragraph for i, paragraph in enumerate(paragraphs) if i % holdout_every]
+    return training, "".join(letter for letter in held_out if letter in swedish_alphabet)
+
+
+def generate_sample(letters, text_length, key_length, rng):
+    """
+    Make a synthetic Part A sample: a plaintext cut out of the corpus, a random key and the ciphertext.
+
+    :param letters: The held-out corpus letters, wrapped around when the plaintext is longer.
+    :param text_length: The length of the plaintext.
+    :param key_length: The length of the key.
+    :param rng: A numpy random Generator.
+    :return: A (plaintext, key, ciphertext) tuple.
+    """
+    start = int(rng.integers(len(letters)))
+    repeated = letters * (-(-(start + text_length) // len(letters)))
+    plaintext = repeated[start:start + text_length]
+    key = "".join(swedish_alphabet[i] for i in rng.integers(len(swedish_alphabet), size=key_length))
+    return plaintext, key, vigenere_encrypt(plaintext, key)
+
+
+def write_sample(directory, name, plaintext, key, ciphertext):
+    """
+    Write a sample as name.plain, name.key and name.crypto, like the files of Part A.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for extension, content in (("plain", plaintext), ("key", key), ("crypto", ciphertext)):
+        with open(os.path.join(directory, f"{name}.{extension}"), "w", encoding="utf-8") as sampleWriter:
+            sampleWriter.write(content)
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _split_and_reconstruct_key(ciphertext, key_length):
+    return reconstruct_key(split_segments(ciphertext, key_length))
+
+
+def _letter_accuracy(key, true_key):
+    if len(key) != len(true_key):
+        return 0.0
+    return sum(a == b for a, b in zip(key, true_key)) / len(true_key)
+
+
+def run_case(letters, text_length, key_length, samples, rng, max_key_length=16, sample_directory=None, name="",
+             table=None):
+    """
+    Time the stages of the pipeline and measure the key recovery on synthetic samples of one grid point.
+
+    :param table: The quadgram table the keys are refined with, trained without the letters (default: the one of
+        the Swedish profile).
+    :return: A dict with the median time of every stage and the accuracies.
+    """
+    key_lengths = range(1, max_key_length + 1)
+    timings = {"friedman_test": [], "rank_periods": [], "calculate_shifts": [], "reconstruct_key": [],
+               "refine_key": [], "vigenere_decrypt": []}
+    length_hits, period_hits, letter_accuracy, refined_accuracy, exact_keys = 0, 0, 0.0, 0.0, 0
+
+    for sample in range(samples):
+        plaintext, key, ciphertext = generate_sample(letters, text_length, key_length, rng)
+        if sample_directory is not None:
+            write_sample(sample_directory, f"{name}_{sample}", plaintext, key, ciphertext)
+
+        estimated_length, elapsed = _timed(friedman_test, ciphertext, None, key_lengths)
+        timings["friedman_test"].append(elapsed)
+        ranking, elapsed = _timed(rank_periods, ciphertext)
+        timings["rank_periods"].append(elapsed)
+        _, elapsed = _timed(calculate_shifts, ciphertext[::key_length])
+        timings["calculate_shifts"].append(elapsed)
+        # The key is reconstructed for the true length, so its accuracy does not depend on the Friedman test
+        reconstructed, elapsed = _timed(_split_and_reconstruct_key, ciphertext, key_length)
+        timings["reconstruct_key"].append(elapsed)
+        refined, elapsed = _timed(refine_key, ciphertext, reconstructed, table)
+        timings["refine_key"].append(elapsed)
+        decrypted, elapsed = _timed(vigenere_decrypt, ciphertext, refined)
+        timings["vigenere_decrypt"].append(elapsed)
+
+        length_hits += estimated_length == key_length
+        period_hits += bool(ranking) and ranking[0][0] == key_length
+        letter_accuracy += _letter_accuracy(reconstructed, key)
+        refined_accuracy += _letter_accuracy(refined, key)
+        exact_keys += decrypted == plaintext
+
+    return {
+        "text_length": text_length,
+        "key_length": key_length,
+        "samples": samples,
+        "median_seconds": {stage: float(np.median(values)) for stage, values in timings.items()},
+        "key_length_accuracy": length_hits / samples,
+        "period_detector_accuracy": period_hits / samples,
+        "key_letter_accuracy": letter_accuracy / samples,
+        "refined_key_letter_accuracy": refined_accuracy / samples,
+        "exact_key_rate": exact_keys / samples,
+    }
+
+
+def run_benchmark(languages=None, text_lengths=DEFAULT_TEXT_LENGTHS, key_lengths=DEFAULT_KEY_LENGTHS, samples=20,
+                  seed=0, sample_directory=None):
+    """
+    Run the whole grid of languages, text lengths and key lengths.
+
+    The samples are cut from the paragraphs split_corpus holds out, and the keys are refined with a profile built
+    from the other paragraphs only.
+
+    :return: A dict with the settings, the environment and one result per grid point.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for language in languages or available_languages():
+        training, letters = split_corpus(language)
+        profile = build_profile(language, training, PUBLISHED_FREQUENCIES.get(language), PUBLISHED_ICS.get(language))
+        for text_length in text_lengths:
+            for key_length in key_lengths:
+                name = f"{language}_{text_length}_{key_length}"
+                directory = None if sample_directory is None else os.path.join(sample_directory, language)
+                result = run_case(letters, text_length, key_length, samples, rng, max(16, key_length),
+                                  directory, name, profile.quadgram)
+                results.append({"language": language, **result})
+    return {
+        "seed": seed,
+        "samples": samples,
+        "holdout_every": HOLDOUT_EVERY,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+
+def find_regressions(report, baseline, time_factor=1.5, accuracy_margin=0.0):
+    """
+    Compare a report with a baseline report of the same grid and seed.
+
+    :param report: The new report.
+    :param baseline: The baseline report.
+    :param time_factor: How many times slower than the baseline a stage may get.
+    :param accuracy_margin: How much lower than the baseline an accuracy may get.
+    :return: A list of messages, one for every regression.
+    """
+    baseline_results = {(result["language"], result["text_length"], result["key_length"]): result
+                        for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        point = (result["language"], result["text_length"], result["key_length"])
+        if point not in baseline_results:
+            continue
+        old = baseline_results[point]
+        for field in ACCURACY_FIELDS:
+            if field in old and result[field] < old[field] - accuracy_margin:
+                regressions.append(f"{point}: {field} dropped from {old[field]:.2f} to {result[field]:.2f}")
+        for stage, seconds in result["median_seconds"].items():
+            old_seconds = old["median_seconds"].get(stage)
+            if old_seconds and seconds > old_seconds * time_factor:
+                regressions.append(f"{point}: {stage} slowed from {old_seconds * 1000:.3f} ms "
+                                   f"to {seconds * 1000:.3f} ms")
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the speed and accuracy of the cracking pipeline.")
+    parser.add_argument("--languages", nargs="*", default=None, help="languages to test (default: all)")
+    parser.add_argument("--text-lengths", nargs="*", type=int, default=DEFAULT_TEXT_LENGTHS)
+    parser.add_argument("--key-lengths", nargs="*", type=int, default=DEFAULT_KEY_LENGTHS)
+    parser.add_argument("--samples", type=int, default=20, help="samples per grid point (default 20)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    parser.add_argument("--write-samples", default=None, help="directory to write the samples to in Part A format")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file to write (default benchmark.json)")
+    parser.add_argument("--baseline", default=None, help="earlier report to check for regressions")
+    parser.add_argument("--time-factor", type=float, default=1.5, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.languages, args.text_lengths, args.key_lengths, args.samples, args.seed,
+                           args.write_samples)
+    with open(args.output, "w", encoding="utf-8") as reportWriter:
+        json.dump(report, reportWriter, ensure_ascii=False, indent=2)
+
+    for result in report["results"]:
+        print(f"{result['language']} n={result['text_length']} k={result['key_length']}: "
+              f"length {result['key_length_accuracy']:.2f}, period {result['period_detector_accuracy']:.2f}, "
+              f"key {result['key_letter_accuracy']:.2f}, refined {result['refined_key_letter_accuracy']:.2f}, "
+              f"exact {result['exact_key_rate']:.2f}, "
+              f"friedman {result['median_seconds']['friedman_test'] * 1000:.2f} ms")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as baselineReader:
+            regressions = find_regressions(report, json.load(baselineReader), args.time_factor)
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+
+from .analysis_cache import DEFAULT_MAX_BYTES, AnalysisCache
+from .codec import vigenere_decrypt
+from .ic_engine import CipherText
+from .key_refiner import refine_key
+from .lab import friedman_test, reconstruct_key, shared_friedman_test, split_segments, text_sharpener
+from .language_profile import load_profile
+from .period_detector import rank_periods
+from .running_key import running_key_decode
+
+
+def read_numbered(directory, name_format, numbers):
+    """
+    Read the ciphertext files of a directory that are numbered like the ones of the lab, skipping missing numbers.
+
+    :param directory: The directory of the ciphertexts.
+    :param name_format: The file name with a {} for the number, e.g. "vig_group{}.crypto".
+    :param numbers: The numbers to try.
+    :return: A list of (number, CipherText) pairs.
+    """
+    ciphertexts = []
+    for i in numbers:
+        try:
+            ciphertexts.append((i, CipherText.from_file(os.path.join(directory, name_format.format(i)))))
+        except FileNotFoundError:
+            pass
+    return ciphertexts
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--cache", default=None,
+                        help="directory of an analysis cache, to reuse the IC curves, scores and keys of earlier runs")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES >> 20,
+                        help=f"size of the cache in megabytes (default {DEFAULT_MAX_BYTES >> 20})")
+
+
+def open_cache(args):
+    """
+    :return: The AnalysisCache asked for by the arguments of add_cache_arguments, or None.
+    """
+    return None if args.cache is None else AnalysisCache(args.cache, args.cache_size << 20)
+
+
+def short_key_main(argv=None):
+    """
+    Break the short key ciphertexts of Part B and print every step.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Break the short key ciphertexts of Part B.")
+    parser.add_argument("directory", nargs="?", default="ciphertexts (short key)",
+                        help="directory of the vig_groupX.crypto files (default: ciphertexts (short key))")
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    cache = open_cache(args)
+
+    groups = read_numbered(args.directory, "vig_group{}.crypto", range(1, 26))
+    key_lengths = []
+    for i, ciphertext in groups:
+        estimated_key_length = friedman_test(ciphertext, cache=cache)
+        print(f"Estimated Key Length of {i}'th group: {estimated_key_length}")
+        # The autocorrelation searches every period up to the text length instead of 1 to 16. It ranks no period for
+        # a text with too few letter pairs
+        ranked_periods = rank_periods(ciphertext)
+        autocorrelation_key_length = ranked_periods[0][0] if ranked_periods else "n/a"
+        print(f"Autocorrelation Key Length of {i}'th group: {autocorrelation_key_length}")
+        key_lengths.append(estimated_key_length)
+
+    print(key_lengths)
+
+    segment_matrix = [split_segments(ciphertext, key_length)
+                      for (_, ciphertext), key_length in zip(groups, key_lengths)]
+    print()
+    print([split_segments(str(ciphertext), key_length) for (_, ciphertext), key_length in zip(groups, key_lengths)])
+
+    print()
+    keys = []
+    for i in range(len(segment_matrix)):
+        key = reconstruct_key(segment_matrix[i], cache)
+        print(f"{i + 1}th Reconstructed Key:", key)
+        keys.append(key)
+
+    # The manual adjustment is replaced by hill-climbing on the Swedish quadgram score of the plaintext
+    print()
+    profile = load_profile()
+    refined_keys = []
+    for i in range(len(keys)):
+        if cache is None:
+            refined_key = refine_key(groups[i][1], keys[i], profile.quadgram)
+        else:
+            refined_key = cache.memoize_key("refined_key", [groups[i][1]],
+                                            lambda: refine_key(groups[i][1], keys[i], profile.quadgram), key=keys[i],
+                                            language=profile.language, profile=profile.fingerprint)
+        print(f"{i + 1}th Refined Key:", refined_key)
+        refined_keys.append(refined_key)
+
+    print()
+    for (i, ciphertext), refined_key in zip(groups, refined_keys):
+        print(f"Decrypted Text for the group {i}:", vigenere_decrypt(ciphertext, refined_key))
+
+
+def long_key_main(argv=None):
+    """
+    Break the long key ciphertexts of Part B and print every step.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Break the long key ciphertexts of Part B.")
+    parser.add_argument("directory", nargs="?", default="ciphertexts (long key)",
+                        help="directory of the X.crypto files (default: ciphertexts (long key))")
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    cache = open_cache(args)
+
+    numbered = read_numbered(args.directory, "{}.crypto", range(1, 7))
+    ciphertexts = [ciphertext for _, ciphertext in numbered]
+
+    estimated_key_length = shared_friedman_test(ciphertexts, cache=cache)
+    print(f"Estimated Key Length of the long texts: {estimated_key_length}")
+    # The autocorrelation searches every period up to the text length instead of 100 to 499
+    ranked_periods = rank_periods(ciphertexts)
+    print("Autocorrelation Key Length Candidates:", [period for period, *_ in ranked_periods[:5]])
+
+    sharpened_text = text_sharpener(ciphertexts, estimated_key_length)
+    print(sharpened_text)
+    print(len(sharpened_text))
+    segment_list = split_segments(sharpened_text, estimated_key_length)
+    print(split_segments(str(sharpened_text), estimated_key_length))
+
+    # The key is Swedish text itself, so it is also decoded together with the plaintexts of all the ciphertexts
+    profile = load_profile()
+    if cache is None:
+        running_key = running_key_decode(ciphertexts, estimated_key_length, table=profile.quadgram)
+    else:
+        running_key = cache.memoize_key("running_key", ciphertexts,
+                                        lambda: running_key_decode(ciphertexts, estimated_key_length,
+                                                                   table=profile.quadgram),
+                                        key_length=estimated_key_length, language=profile.language,
+                                        profile=profile.fingerprint)
+    print("Running Key:", running_key)
+
+    key = reconstruct_key(segment_list, cache)
+    print("Reconstructed Key:", key)
+
+    # The manual correction is replaced by hill-climbing on the Swedish quadgram score of all the plaintexts
+    if cache is None:
+        refined_key = refine_key(ciphertexts, key, profile.quadgram)
+    else:
+        refined_key = cache.memoize_key("refined_key", ciphertexts,
+                                        lambda: refine_key(ciphertexts, key, profile.quadgram), key=key,
+                                        language=profile.language, profile=profile.fingerprint)
+    print("Refined Key:", refined_key)
+
+    for i, ciphertext in numbered:
+        print(f"Decrypted Text {i}:", vigenere_decrypt(ciphertext, refined_key))
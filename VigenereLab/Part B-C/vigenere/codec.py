@@ -0,0 +1,128 @@
+import numpy as np
+
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, encode, swedish_alphabet
+from .instrumentation import stage
+
+# ENCRYPT_TABLE[key letter, plaintext letter] and DECRYPT_TABLE[key letter, ciphertext letter]
+_LETTERS = np.arange(ALPHABET_SIZE)
+ENCRYPT_TABLE = ((_LETTERS[:, None] + _LETTERS[None, :]) % ALPHABET_SIZE).astype(np.uint8)
+DECRYPT_TABLE = ((_LETTERS[None, :] - _LETTERS[:, None]) % ALPHABET_SIZE).astype(np.uint8)
+
+# Code point of every letter of the alphabet
+_CODE_POINTS = np.array([ord(letter) for letter in swedish_alphabet], dtype=np.uint32)
+
+# Number of characters read at a time when streaming
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def encode_key(key):
+    """
+    :param key: The key, made of letters of the alphabet.
+    :return: The alphabet indices of the key.
+    """
+    key_codes = encode(key)
+    if len(key_codes) == 0 or np.any(key_codes == INVALID_CODE):
+        raise ValueError(f"The key must be a non-empty string of letters from {swedish_alphabet!r}")
+    return key_codes
+
+
+def _apply(table, text, key_codes, offset):
+    """
+    Replace every letter of the text through the table, using the key letter of its position.
+    Characters that are not in the alphabet are kept unchanged but still use up a key position.
+    """
+    with stage("vigenere_encrypt" if table is ENCRYPT_TABLE else "vigenere_decrypt", characters=len(text)):
+        code_points = np.frombuffer(str(text).encode("utf-32-le"), dtype=np.uint32).copy()
+        codes = encode(text)
+        valid = codes != INVALID_CODE
+
+        key_positions = (np.flatnonzero(valid) + offset) % len(key_codes)
+        code_points[valid] = _CODE_POINTS[table[key_codes[key_positions], codes[valid]]]
+        return code_points.tobytes().decode("utf-32-le")
+
+
+def vigenere_encrypt(plaintext, key, offset=0):
+    """
+    Encrypt a text with the modified Vigenère cipher.
+
+    :param plaintext: The text to encrypt, as a string or a CipherText.
+    :param key: The key.
+    :param offset: The key position of the first character of the text.
+    :return: The ciphertext.
+    """
+    return _apply(ENCRYPT_TABLE, plaintext, encode_key(key), offset)
+
+
+def vigenere_decrypt(ciphertext, key, offset=0):
+    """
+    Decrypt a text encrypted with the modified Vigenère cipher.
+
+    :param ciphertext: The text to decrypt, as a string or a CipherText.
+    :param key: The key.
+    :param offset: The key position of the first character of the text.
+    :return: The plaintext.
+    """
+    return _apply(DECRYPT_TABLE, ciphertext, encode_key(key), offset)
+
+
+def _stream(table, reader, writer, key, offset, chunk_size):
+    key_codes = encode_key(key)
+    offset %= len(key_codes)
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            return offset
+        writer.write(_apply(table, chunk, key_codes, offset))
+        offset = (offset + len(chunk)) % len(key_codes)
+
+
+def encrypt_stream(reader, writer, key, offset=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypt a text stream chunk by chunk, so the whole text is never held in memory.
+
+    :param reader: A text file object to read the plaintext from.
+    :param writer: A text file object to write the ciphertext to.
+    :param key: The key.
+    :param offset: The key position of the first character read.
+    :param chunk_size: The number of characters handled at a time.
+    :return: The key position of the next character, to resume encryption from.
+    """
+    return _stream(ENCRYPT_TABLE, reader, writer, key, offset, chunk_size)
+
+
+def decrypt_stream(reader, writer, key, offset=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Decrypt a text stream chunk by chunk, so the whole text is never held in memory.
+
+    :param reader: A text file object to read the ciphertext from.
+    :param writer: A text file object to write the plaintext to.
+    :param key: The key.
+    :param offset: The key position of the first character read.
+    :param chunk_size: The number of characters handled at a time.
+    :return: The key position of the next character, to resume decryption from.
+    """
+    return _stream(DECRYPT_TABLE, reader, writer, key, offset, chunk_size)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt files with the modified Vigenère cipher.")
+    parser.add_argument("mode", choices=["encrypt", "decrypt"])
+    parser.add_argument("key_file", help="file holding the key, e.g. vig_group12.key")
+    parser.add_argument("input", help="file to read, e.g. vig_group12.plain")
+    parser.add_argument("output", help="file to write, e.g. vig_group12.crypto")
+    parser.add_argument("--offset", type=int, default=0, help="key position of the first character")
+    args = parser.parse_args()
+
+    with open(args.key_file, encoding="utf-8") as keyReader:
+        key = keyReader.read().strip()
+
+    stream = encrypt_stream if args.mode == "encrypt" else decrypt_stream
+    with open(args.input, encoding="utf-8", newline="") as reader, \
+            open(args.output, "w", encoding="utf-8", newline="") as writer:
+        stream(reader, writer, key, args.offset)
+
+
+if __name__ == "__main__":
+    main()
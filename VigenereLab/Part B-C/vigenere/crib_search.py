@@ -0,0 +1,269 @@
+import numpy as np
+
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, CipherText, encode, swedish_alphabet
+from .instrumentation import count, stage
+
+# _DIFFERENCES[p, c] is the key letter that encrypts plaintext letter p to ciphertext letter c
+_DIFFERENCES = ((np.arange(ALPHABET_SIZE)[None, :] - np.arange(ALPHABET_SIZE)[:, None])
+                % ALPHABET_SIZE).astype(np.uint8)
+# Bits taken by one key letter in a signature
+_LETTER_BITS = (ALPHABET_SIZE - 1).bit_length()
+
+
+def _code_rows(ciphertexts):
+    """
+    Lay the ciphertexts out as rows of alphabet indices, padded with -1, which also marks the characters outside
+    the alphabet.
+    """
+    codes = [encode(ciphertext).astype(np.int64) for ciphertext in ciphertexts]
+    rows = np.full((len(codes), max(map(len, codes), default=0)), -1, dtype=np.int64)
+    for i, text_codes in enumerate(codes):
+        rows[i, :len(text_codes)] = np.where(text_codes == INVALID_CODE, -1, text_codes)
+    return rows
+
+
+def _crib_codes(cribs):
+    """
+    Encode the cribs, rejecting the ones with characters outside the alphabet.
+    """
+    encoded = []
+    for crib in cribs:
+        crib_codes = encode(crib.lower())
+        if len(crib_codes) == 0 or np.any(crib_codes == INVALID_CODE):
+            raise ValueError(f"A crib must be a non-empty string of letters from {swedish_alphabet!r}: {crib!r}")
+        encoded.append(crib_codes.astype(np.int64))
+    return encoded
+
+
+def crib_fragments(ciphertexts, cribs):
+    """
+    Slide every crib over every offset of every ciphertext at once and derive the key fragment each placement
+    implies.
+
+    The cribs of the same length are handled together: the windows of all the ciphertexts are compared with all
+    the cribs in one array operation.
+
+    :param ciphertexts: A ciphertext or a list of ciphertexts, as strings or CipherTexts.
+    :param cribs: The words expected in the plaintexts.
+    :return: A list with one (crib indices, text indices, offsets, fragments) tuple of arrays for every crib length.
+        Row i is the placement of crib crib_indices[i] at character offset offsets[i] of ciphertext
+        text_indices[i], and fragments[i] holds the alphabet indices of the key letters it implies. Placements
+        over characters outside the alphabet are left out.
+    """
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+    rows = _code_rows(ciphertexts)
+
+    by_length = {}
+    for i, crib_codes in enumerate(_crib_codes(cribs)):
+        by_length.setdefault(len(crib_codes), []).append((i, crib_codes))
+
+    results = []
+    for length, indexed in sorted(by_length.items()):
+        if length > rows.shape[1]:
+            continue
+        crib_indices = np.array([i for i, _ in indexed])
+        crib_codes = np.array([codes for _, codes in indexed], dtype=np.int64)
+
+        # windows[t, o] holds the letters of ciphertext t from offset o
+        windows = np.lib.stride_tricks.sliding_window_view(rows, length, axis=1)
+        usable_text, usable_offset = np.nonzero((windows >= 0).all(axis=2))
+        # fragments[c, w] is the key fragment implied by crib c over usable window w
+        fragments = (windows[usable_text, usable_offset][None, :, :] - crib_codes[:, None, :]) % ALPHABET_SIZE
+        count("placements_tried", fragments.shape[0] * fragments.shape[1])
+
+        results.append((np.repeat(crib_indices, len(usable_text)), np.tile(usable_text, len(crib_indices)),
+                        np.tile(usable_offset, len(crib_indices)), fragments.reshape(-1, length)))
+    return results
+
+
+def crib_agreements(ciphertexts, cribs, key_length, min_texts=3, overlap=4, limit=100):
+    """
+    Find the key letters implied alike by different cribs placed in different ciphertexts.
+
+    The cribs are cut into spans of overlap letters, and every distinct span is placed over every window of overlap
+    letters of every ciphertext at once. Each placement implies key letters at a key position, and the placements
+    implying the same ones are grouped by one sort of their bit-packed signatures. The same crib letters over the same
+    ciphertext letters always imply the same key, e.g. at the equal starts of ciphertexts beginning with the same
+    words, so a group only counts if it holds at least two different crib spans. A crib placed where it is not in
+    the plaintext implies random key letters, and with a long crib list two ciphertexts agree by chance all the
+    time, so min_texts should stay at 3 or more.
+
+    :param ciphertexts: The ciphertexts encrypted with the same key from its first position, as strings or
+        CipherTexts.
+    :param cribs: The words expected in the plaintexts. Cribs shorter than overlap are not used.
+    :param key_length: The length of the key.
+    :param min_texts: The fewest ciphertexts the agreeing spans have to come from.
+    :param overlap: The number of consecutive key letters that have to agree, between 1 and 8.
+    :param limit: The largest number of agreements returned, or None for all of them.
+    :return: A list of (key position, key letters, placements) tuples, the ones holding the most different crib
+        spans, then the most ciphertexts, first. The key position is the one of the first key letter, and
+        placements is a list of (text index, offset, crib) tuples where offset is the character offset of the span
+        in the ciphertext.
+    """
+    if not 1 <= overlap <= 8:
+        raise ValueError("The overlap must be between 1 and 8 letters")
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+
+    with stage("crib_agreements", texts=len(ciphertexts), cribs=len(cribs), key_length=key_length):
+        # The distinct crib spans, and the cribs holding each of them
+        spans, span_cribs = {}, []
+        for i, crib_codes in enumerate(_crib_codes(cribs)):
+            for start in range(len(crib_codes) - overlap + 1):
+                letters = tuple(crib_codes[start:start + overlap].tolist())
+                if letters not in spans:
+                    spans[letters] = len(span_cribs)
+                    span_cribs.append([])
+                if i not in span_cribs[spans[letters]]:
+                    span_cribs[spans[letters]].append(i)
+        if not spans:
+            return []
+        span_letters = np.array(list(spans), dtype=np.uint8)
+
+        # The windows of overlap letters of the ciphertexts, without characters outside the alphabet
+        rows = _code_rows(ciphertexts)
+        if rows.shape[1] < overlap:
+            return []
+        windows = np.lib.stride_tricks.sliding_window_view(rows, overlap, axis=1)
+        window_texts, window_offsets = np.nonzero((windows >= 0).all(axis=2))
+        window_letters = windows[window_texts, window_offsets].astype(np.uint8)
+        window_count = len(window_texts)
+        placement_count = len(span_letters) * window_count
+        count("placements_tried", placement_count)
+
+        # signatures[s, w] holds the key position and the key letters implied by span s over window w, one letter
+        # every _LETTER_BITS bits
+        signature_bits = max(1, (key_length - 1).bit_length()) + overlap * _LETTER_BITS
+        signatures = np.empty((len(span_letters), window_count), dtype=np.uint32 if signature_bits <= 32 else np.int64)
+        signatures[:] = window_offsets % key_length
+        for j in range(overlap):
+            signatures <<= _LETTER_BITS
+            signatures |= _DIFFERENCES[span_letters[:, j]][:, window_letters[:, j]]
+        signatures = signatures.ravel().astype(np.int64)
+
+        # Sorting the signatures with the placement index packed in the low bits is much faster than an argsort.
+        # Either way equal signatures stay in placement order, so the placements of a group are sorted by span
+        index_bits = max(1, (placement_count - 1).bit_length())
+        if signature_bits + index_bits <= 63:
+            signatures <<= index_bits
+            signatures |= np.arange(placement_count)
+            signatures.sort()
+            order = signatures & ((1 << index_bits) - 1)
+            signatures >>= index_bits
+        else:
+            order = np.argsort(signatures, kind="stable")
+            signatures = signatures[order]
+
+        # Most placements agree with fewer than min_texts others, and are dropped before anything else is looked up:
+        # a placement is kept if it is in a run of at least that many equal sorted signatures
+        run = max(2, min_texts)
+        shared = np.zeros(placement_count, dtype=bool)
+        if placement_count >= run:
+            repeated = signatures[run - 1:] == signatures[:placement_count - run + 1]
+            for j in range(run):
+                shared[j:placement_count - run + 1 + j] |= repeated
+        order, signatures = order[shared], signatures[shared]
+        if len(order) == 0:
+            return []
+        placement_spans, placement_windows = np.divmod(order, window_count)
+        texts = window_texts[placement_windows]
+
+        # The distinct crib spans and ciphertexts of every group of placements
+        new_group = np.r_[True, signatures[1:] != signatures[:-1]]
+        group_ids = np.cumsum(new_group) - 1
+        group_starts = np.flatnonzero(new_group)
+        group_ends = np.r_[group_starts[1:], len(signatures)]
+        new_span = new_group | np.r_[True, placement_spans[1:] != placement_spans[:-1]]
+        span_counts = np.bincount(group_ids[new_span], minlength=len(group_starts))
+        if len(ciphertexts) <= 64:
+            # One bit per ciphertext, or-ed together over every group
+            text_bits = np.bitwise_or.reduceat(np.left_shift(1, texts.astype(np.uint64)), group_starts)
+            text_counts = np.unpackbits(text_bits.view(np.uint8)).reshape(len(group_starts), -1).sum(axis=1)
+        else:
+            group_texts = np.unique(group_ids * len(ciphertexts) + texts)
+            text_counts = np.bincount(group_texts // len(ciphertexts), minlength=len(group_starts))
+
+        groups = np.flatnonzero((span_counts >= 2) & (text_counts >= min_texts))
+        groups = groups[np.lexsort((-text_counts[groups], -span_counts[groups]))][:limit]
+        count("crib_agreements", len(groups))
+
+        offsets = window_offsets[placement_windows]
+        agreements = []
+        for group in groups.tolist():
+            start, end = group_starts[group], group_ends[group]
+            signature = int(signatures[start])
+            key_position = signature >> overlap * _LETTER_BITS
+            letters = "".join(swedish_alphabet[signature >> j * _LETTER_BITS & (1 << _LETTER_BITS) - 1]
+                              for j in range(overlap - 1, -1, -1))
+            agreements.append((key_position, letters, [
+                (text, offset, cribs[crib]) for text, offset, span
+                in zip(texts[start:end].tolist(), offsets[start:end].tolist(), placement_spans[start:end].tolist())
+                for crib in span_cribs[span]]))
+    return agreements
+
+
+def pin_key(key, agreements, max_changes=1):
+    """
+    Overwrite the letters of a key with the fragments the cribs agree on.
+
+    Chance agreements are common, and a fragment contradicting several letters of a key that is mostly right is
+    far more likely one of them than a correction, so fragments changing more than max_changes letters are skipped.
+    Pinning can still make a right letter wrong, so the result should be checked, e.g. with refine_key or by
+    reading the plaintexts.
+
+    :param key: The key to correct, e.g. the one reconstructed with the chi-square test.
+    :param agreements: Agreements returned by crib_agreements. The earlier ones win where two overlap.
+    :param max_changes: The most letters of the key a fragment may change.
+    :return: The corrected key.
+    """
+    letters = list(key)
+    pinned = [False] * len(letters)
+    for key_position, fragment, _ in agreements:
+        positions = [(key_position + j) % len(letters) for j in range(len(fragment))]
+        if sum(key[position] != letter for position, letter in zip(positions, fragment)) > max_changes:
+            count("fragments_skipped")
+            continue
+        for position, letter in zip(positions, fragment):
+            if not pinned[position]:
+                letters[position] = letter
+                pinned[position] = True
+    return "".join(letters)
+
+
+def main():
+    import argparse
+
+    from .batch_crack import find_ciphertexts
+
+    parser = argparse.ArgumentParser(description="Drag cribs across ciphertexts sharing a key and show where the "
+                                                 "key fragments they imply agree.")
+    parser.add_argument("patterns", nargs="+", help="directories of .crypto files, glob patterns or files")
+    parser.add_argument("--key-length", type=int, required=True, help="length of the shared key")
+    parser.add_argument("--crib", action="append", default=[], help="a word expected in the plaintexts, repeatable")
+    parser.add_argument("--cribs", default=None, help="file with one crib per line")
+    parser.add_argument("--min-texts", type=int, default=3, help="fewest ciphertexts that have to agree (default 3)")
+    parser.add_argument("--overlap", type=int, default=4, help="key letters that have to agree (default 4)")
+    parser.add_argument("--limit", type=int, default=100, help="most agreements shown (default 100)")
+    parser.add_argument("--key", default=None,
+                        help="a key to correct with the agreements, e.g. the chi-square one; chance agreements can "
+                             "make right letters wrong, so check the result")
+    args = parser.parse_args()
+
+    cribs = list(args.crib)
+    if args.cribs is not None:
+        with open(args.cribs, encoding="utf-8") as cribReader:
+            cribs.extend(line.strip() for line in cribReader if line.strip())
+    paths = find_ciphertexts(args.patterns)
+    ciphertexts = [CipherText.from_file(path) for path in paths]
+
+    agreements = crib_agreements(ciphertexts, cribs, args.key_length, args.min_texts, args.overlap, args.limit)
+    for key_position, fragment, placements in agreements:
+        sources = ", ".join(f"{paths[text]}@{offset}:{crib}" for text, offset, crib in placements)
+        print(f"{key_position:4d} {fragment}  {sources}")
+    if args.key is not None:
+        print(f"Pinned Key: {pin_key(args.key, agreements)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import numpy as np
+
+from .instrumentation import count, stage
+
+swedish_alphabet = "abcdefghijklmnopqrstuvwxyzåäö"
+ALPHABET_SIZE = len(swedish_alphabet)
+
+# Code given to every character that is not part of the alphabet
+INVALID_CODE = 255
+
+# Upper bound for the number of (key length, character) pairs and of histogram counters in one vectorized pass
+_CHUNK_ELEMENTS = 1 << 22
+
+# Lookup table from Latin-1 code points to alphabet indices
+_ENCODE_TABLE = np.full(256, INVALID_CODE, dtype=np.uint8)
+for _index, _letter in enumerate(swedish_alphabet):
+    _ENCODE_TABLE[ord(_letter)] = _index
+
+
+def encode(text):
+    """
+    Encode a text into alphabet indices.
+
+    :param text: The text to encode. A CipherText gives its codes without encoding the text again, and an array of
+        codes, e.g. a column of a CipherText, is returned as it is.
+    :return: A uint8 array holding the index of every character, INVALID_CODE for characters outside the alphabet.
+    """
+    if isinstance(text, CipherText):
+        return text.codes
+    if isinstance(text, np.ndarray):
+        return text
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    codes = np.full(len(code_points), INVALID_CODE, dtype=np.uint8)
+    latin = code_points < 256
+    codes[latin] = _ENCODE_TABLE[code_points[latin]]
+    return codes
+
+
+class CipherText:
+    """
+    A text encoded once into a uint8 buffer of alphabet indices, with a mask of its letters.
+
+    Every stage taking a ciphertext string also takes a CipherText and reuses its buffer instead of encoding the
+    text again. The columns of any period are strided views of the buffer, so splitting the text copies nothing.
+    """
+
+    __slots__ = ("text", "codes", "mask")
+
+    def __init__(self, text, codes=None):
+        """
+        :param text: The text, as a string or as UTF-8 bytes.
+        :param codes: The alphabet indices of the text, if they are known already.
+        """
+        if isinstance(text, (bytes, bytearray, memoryview)):
+            text = bytes(text).decode("utf-8")
+        self.text = text
+        self.codes = encode(text) if codes is None else codes
+        self.codes.flags.writeable = False
+        # True for the letters of the alphabet, False for the characters outside it
+        self.mask = self.codes != INVALID_CODE
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        :param path: A UTF-8 text file.
+        :return: The CipherText of its content.
+        """
+        with open(path, "rb") as cipherReader:
+            return cls(cipherReader.read())
+
+    @classmethod
+    def concatenate(cls, ciphertexts):
+        """
+        :param ciphertexts: Strings or CipherTexts.
+        :return: One CipherText of all of them, reusing the codes of the CipherTexts.
+        """
+        codes = [encode(ciphertext) for ciphertext in ciphertexts]
+        return cls("".join(map(str, ciphertexts)), np.concatenate(codes) if codes else np.empty(0, dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"CipherText({self.text!r})"
+
+    def __getitem__(self, index):
+        """
+        :param index: A slice of the characters.
+        :return: A CipherText whose codes are a view of these.
+        """
+        if not isinstance(index, slice):
+            raise TypeError("A CipherText can only be sliced")
+        return CipherText(self.text[index], self.codes[index])
+
+    @property
+    def letter_count(self):
+        return int(np.count_nonzero(self.mask))
+
+    def column(self, position, period):
+        """
+        :param position: The key position of the column.
+        :param period: The key length.
+        :return: A view of the codes encrypted with that key position, INVALID_CODE for the other characters.
+        """
+        return self.codes[position::period]
+
+    def columns(self, period):
+        """
+        :param period: The key length.
+        :return: A view of the codes for every key position, the segments of the text without copying it.
+        """
+        return [self.column(position, period) for position in range(period)]
+
+    def rows(self, period):
+        """
+        :param period: The key length.
+        :return: A view of the complete rows of the text as an array of shape (number of rows, period). Column j
+            of it is the strided view rows[:, j].
+        """
+        return self.codes[:len(self.codes) - len(self.codes) % period].reshape(-1, period)
+
+
+def ic_curve(ciphertexts, key_lengths=range(1, 17), pooled=False):
+    """
+    Calculate the average index of coincidence of the columns for every candidate key length.
+
+    Every ciphertext is encoded once and the column histograms of a whole block of key lengths are counted
+    with a single bincount, instead of slicing and counting each column separately.
+
+    :param ciphertexts: A ciphertext or a list of ciphertexts, as strings or CipherTexts.
+    :param key_lengths: The candidate key lengths.
+    :param pooled: If True, the ciphertexts are assumed to be encrypted with the same key starting at the same
+        position, and the columns of all the ciphertexts are merged before calculating the IC.
+    :return: An array of shape (number of ciphertexts, number of key lengths) holding the average IC, or a single
+        curve if a single ciphertext was given or the ciphertexts are pooled. Key lengths without any column of
+        at least two letters get NaN.
+    """
+    single = isinstance(ciphertexts, (str, CipherText))
+    if single:
+        ciphertexts = [ciphertexts]
+
+    with stage("ic_curve", texts=len(ciphertexts), characters=sum(map(len, ciphertexts))):
+        key_lengths = np.asarray(key_lengths, dtype=np.int64)
+        encoded = [encode(ciphertext) for ciphertext in ciphertexts]
+
+        codes = np.concatenate(encoded) if encoded else np.empty(0, dtype=np.uint8)
+        positions = np.concatenate([np.arange(len(text)) for text in encoded]) if encoded \
+            else np.empty(0, dtype=np.int64)
+        text_ids = np.repeat(np.arange(len(encoded)), [len(text) for text in encoded])
+
+        valid = codes != INVALID_CODE
+        codes = codes[valid].astype(np.int64)
+        positions = positions[valid]
+        text_ids = text_ids[valid]
+        if pooled:
+            text_ids = np.zeros_like(text_ids)
+        text_count = 1 if pooled else len(encoded)
+
+        curves = np.full((text_count, len(key_lengths)), np.nan)
+
+        for start, stop in _length_chunks(key_lengths, len(codes), text_count):
+            lengths = key_lengths[start:stop]
+            column_offsets = _column_offsets(lengths)
+            histogram = _column_histogram(codes, positions, text_ids, text_count, lengths, column_offsets)
+            curves[:, start:stop] = _average_ic(histogram, column_offsets)
+            count("candidate_lengths", len(lengths))
+            count("segments_evaluated", text_count * int(lengths.sum()))
+
+        if single or pooled:
+            return curves[0]
+        return curves
+
+
+def _length_chunks(key_lengths, letter_count, text_count):
+    """
+    Split the key lengths into blocks small enough for one vectorized pass: both the (key length, character) pairs
+    and the text_count * sum(lengths) * ALPHABET_SIZE histogram counters of a block stay under _CHUNK_ELEMENTS,
+    unless a single key length is already over it.
+
+    :return: A list of (start, stop) index pairs into key_lengths.
+    """
+    letter_count = max(1, letter_count)
+    chunks = []
+    start = pairs = counters = 0
+    for i, length in enumerate(np.asarray(key_lengths).tolist()):
+        length_counters = text_count * length * ALPHABET_SIZE
+        if i > start and (pairs + letter_count > _CHUNK_ELEMENTS or counters + length_counters > _CHUNK_ELEMENTS):
+            chunks.append((start, i))
+            start = i
+            pairs = counters = 0
+        pairs += letter_count
+        counters += length_counters
+    if start < len(key_lengths):
+        chunks.append((start, len(key_lengths)))
+    return chunks
+
+
+def _column_offsets(lengths):
+    """
+    Index of the first column of every key length when the columns of all the key lengths are laid out in a row.
+    """
+    return np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+
+
+def _column_histogram(codes, positions, text_ids, text_count, lengths, column_offsets):
+    """
+    Count the letters of every column of every key length with a single bincount.
+
+    :return: An array of shape (text_count, number of columns, ALPHABET_SIZE).
+    """
+    columns_per_text = int(np.sum(lengths))
+
+    # Column of every character for every key length
+    columns = column_offsets[:, None] + positions[None, :] % lengths[:, None]
+    bins = ((text_ids[None, :] * columns_per_text + columns) * ALPHABET_SIZE + codes[None, :]).ravel()
+    histogram = np.bincount(bins, minlength=text_count * columns_per_text * ALPHABET_SIZE)
+    return histogram.reshape(text_count, columns_per_text, ALPHABET_SIZE)
+
+
+def _average_ic(histogram, column_offsets):
+    """
+    Average the IC of the columns of every key length, skipping the columns with less than two letters.
+
+    :param histogram: Column histograms of shape (text_count, number of columns, ALPHABET_SIZE).
+    :param column_offsets: Index of the first column of every key length.
+    :return: An array of shape (text_count, number of key lengths).
+    """
+    column_totals = histogram.sum(axis=2)
+    coincidences = (histogram * (histogram - 1)).sum(axis=2)
+    usable = column_totals > 1
+    column_ics = np.zeros(column_totals.shape)
+    column_ics[usable] = coincidences[usable] / (column_totals[usable] * (column_totals[usable] - 1))
+
+    ic_sums = np.add.reduceat(column_ics, column_offsets, axis=1)
+    usable_counts = np.add.reduceat(usable, column_offsets, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(usable_counts > 0, ic_sums / usable_counts, np.nan)
+
+
+def closest_key_length(curve, key_lengths=range(1, 17), target_ic=0.0681):
+    """
+    Pick the key length whose average IC is closest to the IC of the language.
+
+    :param curve: The IC curve returned by ic_curve.
+    :param key_lengths: The key lengths the curve was calculated for.
+    :param target_ic: The index of coincidence of the language (default 0.0681 for Swedish).
+    :return: The estimated key length, the shortest one on ties.
+    """
+    key_lengths = np.asarray(key_lengths)
+    differences = np.abs(np.asarray(curve) - target_ic)
+    if np.all(np.isnan(differences)):
+        return int(key_lengths[0])
+    return int(key_lengths[np.nanargmin(differences)])
+
+
+def ranked_key_lengths(curve, key_lengths=range(1, 17), target_ic=0.0681):
+    """
+    Order the key lengths by how close their average IC is to the IC of the language.
+
+    :param curve: The IC curve returned by ic_curve.
+    :param key_lengths: The key lengths the curve was calculated for.
+    :param target_ic: The index of coincidence of the language (default 0.0681 for Swedish).
+    :return: A list of (key length, average IC) pairs, the best candidate first.
+    """
+    key_lengths = np.asarray(key_lengths)
+    curve = np.asarray(curve)
+    differences = np.abs(curve - target_ic)
+    order = np.argsort(np.where(np.isnan(differences), np.inf, differences), kind="stable")
+    return [(int(key_lengths[i]), float(curve[i])) for i in order if not np.isnan(curve[i])]
+
+
+class KeyLengthAccumulator:
+    """
+    Letter counts of every column of every candidate key length, for ciphertexts encrypted with the same key.
+
+    New ciphertexts are folded into the counts with add, so the candidate key lengths can be re-ranked without
+    going over the earlier ciphertexts again. The memory used is sum(key_lengths) * ALPHABET_SIZE counters no
+    matter how many ciphertexts are added.
+    """
+
+    def __init__(self, key_lengths=range(100, 500)):
+        """
+        :param key_lengths: The candidate key lengths.
+        """
+        self.key_lengths = np.asarray(key_lengths, dtype=np.int64)
+        self.column_offsets = _column_offsets(self.key_lengths)
+        self.counts = np.zeros((int(self.key_lengths.sum()), ALPHABET_SIZE), dtype=np.int64)
+        self.text_count = 0
+        self.letter_count = 0
+
+    def add(self, ciphertext):
+        """
+        Add the letters of a ciphertext to the column counts. The ciphertext is assumed to start at the first
+        position of the key.
+
+        :param ciphertext: The ciphertext to add.
+        """
+        with stage("accumulator_add", characters=len(ciphertext)):
+            codes = encode(ciphertext)
+            positions = np.flatnonzero(codes != INVALID_CODE)
+            codes = codes[positions].astype(np.int64)
+            text_ids = np.zeros(len(codes), dtype=np.int64)
+
+            for start, stop in _length_chunks(self.key_lengths, len(codes), 1):
+                lengths = self.key_lengths[start:stop]
+                first_column = self.column_offsets[start]
+                column_offsets = self.column_offsets[start:stop] - first_column
+                histogram = _column_histogram(codes, positions, text_ids, 1, lengths, column_offsets)
+                self.counts[first_column:first_column + histogram.shape[1]] += histogram[0]
+                count("segments_evaluated", histogram.shape[1])
+
+            self.text_count += 1
+            self.letter_count += len(codes)
+
+    def curve(self):
+        """
+        :return: The average IC of the columns for every candidate key length.
+        """
+        return _average_ic(self.counts[None, :, :], self.column_offsets)[0]
+
+    def ranking(self, target_ic=0.0681):
+        """
+        :param target_ic: The index of coincidence of the language (default 0.0681 for Swedish).
+        :return: A list of (key length, average IC) pairs, the best candidate first.
+        """
+        return ranked_key_lengths(self.curve(), self.key_lengths, target_ic)
+
+    def best_key_length(self, target_ic=0.0681):
+        """
+        :param target_ic: The index of coincidence of the language (default 0.0681 for Swedish).
+        :return: The key length whose average IC is closest to target_ic.
+        """
+        return closest_key_length(self.curve(), self.key_lengths, target_ic)
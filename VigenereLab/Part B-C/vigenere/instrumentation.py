@@ -0,0 +1,227 @@
+import os
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+# The active recorder, None while instrumentation is disabled
+_recorder = None
+
+# Returned by stage while disabled, so an instrumented block costs one global lookup and an empty with
+_DISABLED_STAGE = nullcontext()
+
+
+class Recorder:
+    """
+    Collects one event per instrumented stage: its job, wall time, input sizes and counters.
+    """
+
+    def __init__(self, origin=None):
+        """
+        :param origin: The perf_counter time the event start times are measured from (default: now). Processes
+            given the same origin produce start times on one timeline.
+        """
+        self.events = []
+        self.origin = perf_counter() if origin is None else origin
+        self.job = None
+        self._stack = []
+
+    def count(self, counter, amount):
+        if self._stack:
+            counters = self._stack[-1].counters
+            counters[counter] = counters.get(counter, 0) + amount
+
+
+class _Stage:
+    __slots__ = ("recorder", "name", "sizes", "counters", "start")
+
+    def __init__(self, recorder, name, sizes):
+        self.recorder = recorder
+        self.name = name
+        self.sizes = sizes
+        self.counters = {}
+
+    def __enter__(self):
+        self.recorder._stack.append(self)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = perf_counter()
+        recorder = self.recorder
+        recorder._stack.pop()
+        recorder.events.append({
+            "job": recorder.job,
+            "stage": self.name,
+            "stack": [stage.name for stage in recorder._stack] + [self.name],
+            "start": self.start - recorder.origin,
+            "seconds": end - self.start,
+            "sizes": self.sizes,
+            "counters": self.counters,
+        })
+        return False
+
+
+def stage(name, **sizes):
+    """
+    Time a block of the pipeline when instrumentation is enabled.
+
+    :param name: The name of the stage.
+    :param sizes: Input sizes to record with it, e.g. letters=len(ciphertext).
+    :return: A context manager.
+    """
+    if _recorder is None:
+        return _DISABLED_STAGE
+    return _Stage(_recorder, name, sizes)
+
+
+def count(counter, amount=1):
+    """
+    Add to a counter of the innermost running stage when instrumentation is enabled.
+
+    :param counter: The name of the counter, e.g. "shifts_scored".
+    :param amount: The amount to add.
+    """
+    if _recorder is not None:
+        _recorder.count(counter, amount)
+
+
+@contextmanager
+def job(label):
+    """
+    Attribute the stages run inside the block to one job, e.g. one ciphertext file.
+
+    :param label: The name of the job.
+    """
+    if _recorder is None:
+        yield
+        return
+    previous, _recorder.job = _recorder.job, label
+    try:
+        yield
+    finally:
+        _recorder.job = previous
+
+
+def enabled():
+    return _recorder is not None
+
+
+def enable(origin=None):
+    """
+    Start recording. Any events of an earlier recorder are dropped.
+
+    :param origin: The perf_counter time the event start times are measured from (default: now).
+    :return: The new Recorder.
+    """
+    global _recorder
+    _recorder = Recorder(origin)
+    return _recorder
+
+
+def disable():
+    """
+    Stop recording.
+
+    :return: The Recorder that was active, or None.
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+@contextmanager
+def recording(origin=None):
+    """
+    Record the stages run inside the block.
+
+    :param origin: The perf_counter time the event start times are measured from (default: now).
+    :return: The Recorder, whose events are complete once the block ends.
+    """
+    recorder = enable(origin)
+    try:
+        yield recorder
+    finally:
+        disable()
+
+
+def summarize(events):
+    """
+    Add up the events of every (job, stage) pair.
+
+    :param events: Recorded events.
+    :return: A list of dicts with the job, stage, number of calls, total seconds, and summed sizes and counters.
+    """
+    totals = {}
+    for event in events:
+        key = (event["job"], event["stage"])
+        if key not in totals:
+            totals[key] = {"job": event["job"], "stage": event["stage"], "calls": 0, "seconds": 0.0,
+                           "sizes": defaultdict(int), "counters": defaultdict(int)}
+        total = totals[key]
+        total["calls"] += 1
+        total["seconds"] += event["seconds"]
+        for name, value in event["sizes"].items():
+            total["sizes"][name] += value
+        for name, value in event["counters"].items():
+            total["counters"][name] += value
+    return [{**total, "sizes": dict(total["sizes"]), "counters": dict(total["counters"])} for total in totals.values()]
+
+
+def to_chrome_trace(events, pid=None):
+    """
+    Convert events to the Chrome trace event format, readable by chrome://tracing, Perfetto and speedscope.
+
+    :param events: Recorded events.
+    :param pid: The process id to put in the trace (default: the current one, or the "pid" field of the events).
+    :return: A dict ready for json.dump.
+    """
+    trace = []
+    for event in events:
+        trace.append({
+            "name": event["stage"],
+            "cat": event["job"] or "",
+            "ph": "X",
+            "ts": event["start"] * 1e6,
+            "dur": event["seconds"] * 1e6,
+            "pid": event.get("pid", pid if pid is not None else os.getpid()),
+            "tid": 0,
+            "args": {**event["sizes"], **event["counters"]},
+        })
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def to_collapsed_stacks(events):
+    """
+    Convert events to the collapsed stack format of flamegraph.pl, with the self time of every stack in
+    microseconds.
+
+    :param events: Recorded events.
+    :return: The lines of the collapsed stacks.
+    """
+    self_times = defaultdict(float)
+    for event in events:
+        stack = ";".join(([event["job"]] if event["job"] else []) + event["stack"])
+        self_times[stack] += event["seconds"]
+        if len(event["stack"]) > 1:
+            parent = ";".join(([event["job"]] if event["job"] else []) + event["stack"][:-1])
+            self_times[parent] -= event["seconds"]
+    return [f"{stack} {max(0, round(seconds * 1e6))}" for stack, seconds in self_times.items()]
+
+
+def write_trace(events, path):
+    """
+    Write events to a file, in a format chosen by its extension: .folded or .txt for collapsed stacks, .trace.json
+    for a Chrome trace, and plain JSON events otherwise.
+
+    :param events: Recorded events.
+    :param path: The file to write.
+    """
+    import json
+
+    with open(path, "w", encoding="utf-8") as traceWriter:
+        if path.endswith((".folded", ".txt")):
+            traceWriter.write("\n".join(to_collapsed_stacks(events)) + "\n")
+        elif path.endswith(".trace.json"):
+            json.dump(to_chrome_trace(events), traceWriter)
+        else:
+            json.dump({"events": events, "summary": summarize(events)}, traceWriter, ensure_ascii=False)
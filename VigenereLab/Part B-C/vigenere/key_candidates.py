@@ -0,0 +1,111 @@
+import heapq
+
+import numpy as np
+
+from .codec import vigenere_decrypt
+from .ic_engine import ALPHABET_SIZE, CipherText, ic_curve, ranked_key_lengths
+from .instrumentation import count, stage
+from .language_profile import load_profile
+from .shift_solver import SWEDISH_FREQUENCIES, column_histograms, shift_scores, shifts_to_key
+
+
+def candidate_lattice(ciphertexts, key_lengths=range(1, 17), swedish_ic=None, top_lengths=3,
+                      expected_frequencies=SWEDISH_FREQUENCIES):
+    """
+    Rank the candidate key lengths and score every shift of every key position of the best ones.
+
+    :param ciphertexts: A ciphertext or a list of ciphertexts encrypted with the same key from its first position.
+    :param key_lengths: The candidate key lengths.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param top_lengths: The number of key lengths to keep.
+    :param expected_frequencies: The expected frequency of every letter of the alphabet.
+    :return: A list of (key length, average IC, scores) tuples, the best key length first. scores has shape
+        (key length, ALPHABET_SIZE) and holds the chi-square statistic of every shift of every key position.
+    """
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+
+    ranking = ranked_key_lengths(ic_curve(ciphertexts, key_lengths, pooled=True), key_lengths, swedish_ic)
+    lattice = []
+    for key_length, average_ic in ranking[:top_lengths]:
+        histograms = sum(column_histograms(ciphertext, key_length) for ciphertext in ciphertexts)
+        lattice.append((key_length, average_ic, shift_scores(histograms, expected_frequencies)))
+    return lattice
+
+
+def k_best_shifts(scores):
+    """
+    Enumerate the shifts of all the key positions in increasing order of their total chi-square statistic.
+
+    The shifts of every position are sorted once, and a heap holds the frontier of rank combinations. Every
+    combination is reached from exactly one parent, the one with the rank of its last raised position lowered,
+    so nothing is generated twice and at most key length combinations are added per candidate yielded.
+
+    :param scores: A score matrix of shape (key length, ALPHABET_SIZE), as returned by shift_scores.
+    :return: A generator of (total chi-square statistic, shifts) pairs, the best first.
+    """
+    # Positions without letters score every shift the same
+    scores = np.where(np.isnan(scores), 0.0, scores)
+    order = np.argsort(scores, axis=1, kind="stable")
+    sorted_scores = np.take_along_axis(scores, order, axis=1).tolist()
+    order = order.tolist()
+    key_length = len(order)
+
+    ranks = (0,) * key_length
+    # (total, ranks, first position that may still be raised)
+    heap = [(sum(row[0] for row in sorted_scores), ranks, 0)]
+    while heap:
+        total, ranks, first = heapq.heappop(heap)
+        count("keys_enumerated")
+        yield total, [order[j][rank] for j, rank in enumerate(ranks)]
+
+        for j in range(first, key_length):
+            rank = ranks[j]
+            if rank + 1 < ALPHABET_SIZE:
+                raised = ranks[:j] + (rank + 1,) + ranks[j + 1:]
+                heapq.heappush(heap, (total + sorted_scores[j][rank + 1] - sorted_scores[j][rank], raised, j))
+
+
+def k_best_keys(scores):
+    """
+    :param scores: A score matrix of shape (key length, ALPHABET_SIZE), as returned by shift_scores.
+    :return: A generator of (total chi-square statistic, key) pairs, the best first.
+    """
+    for total, shifts in k_best_shifts(scores):
+        yield total, shifts_to_key(shifts)
+
+
+def first_accepted_key(ciphertexts, lattice, accept, limit=1000):
+    """
+    Try the keys of a lattice until one decrypts the ciphertexts to acceptable plaintexts.
+
+    The key lengths are tried in the order of the lattice, and at most limit keys of each.
+
+    :param ciphertexts: A ciphertext or a list of ciphertexts.
+    :param lattice: The lattice returned by candidate_lattice.
+    :param accept: A function taking the list of plaintexts and returning True if they are valid.
+    :param limit: The number of keys tried for every key length.
+    :return: The first accepted key, or None.
+    """
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+
+    with stage("first_accepted_key", key_lengths=len(lattice), limit=limit):
+        for _, _, scores in lattice:
+            for tried, (_, key) in enumerate(k_best_keys(scores)):
+                if tried == limit:
+                    break
+                if accept([vigenere_decrypt(ciphertext, key) for ciphertext in ciphertexts]):
+                    return key
+    return None
+
+
+def quadgram_acceptor(profile, min_score=-4.0):
+    """
+    :param profile: The LanguageProfile of the language, e.g. load_profile().
+    :param min_score: The lowest average log10 quadgram probability of an accepted plaintext.
+    :return: A function for first_accepted_key accepting plaintexts that score at least min_score together.
+    """
+    return lambda plaintexts: profile.score("".join(plaintexts)) >= min_score
@@ -0,0 +1,83 @@
+import numpy as np
+
+from .codec import encode_key
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, CipherText, encode, swedish_alphabet
+from .instrumentation import count, stage
+from .language_profile import load_profile
+from .quadgram_model import QUADGRAM_WEIGHTS
+
+
+def _prepare(ciphertexts, key_length):
+    """
+    Encode the ciphertexts and find the key column of every letter and the quadgrams that stay inside one text.
+    """
+    codes, columns, starts = [], [], []
+    offset = 0
+    for ciphertext in ciphertexts:
+        text_codes = encode(ciphertext)
+        positions = np.flatnonzero(text_codes != INVALID_CODE)
+        codes.append(text_codes[positions].astype(np.int64))
+        columns.append(positions % key_length)
+        starts.append(np.arange(offset, offset + max(0, len(positions) - 3)))
+        offset += len(positions)
+    return np.concatenate(codes), np.concatenate(columns), np.concatenate(starts)
+
+
+def refine_key(ciphertexts, key, table=None, max_passes=20):
+    """
+    Improve a key by hill-climbing on the quadgram score of the plaintext.
+
+    Every key position is changed in turn to the letter that gives the highest quadgram score. Only the
+    quadgrams touching the letters of that key position are rescored, for all 29 letters at once. The passes
+    over the key stop when a whole pass changes nothing.
+
+    :param ciphertexts: A ciphertext or a list of ciphertexts encrypted with the same key.
+    :param key: The starting key, e.g. the one reconstructed with the chi-square test.
+    :param table: A quadgram table (default: the one of the Swedish profile).
+    :param max_passes: The maximum number of passes over the key.
+    :return: The refined key.
+    """
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+    table = load_profile().quadgram if table is None else table
+
+    with stage("refine_key", texts=len(ciphertexts), key_length=len(key)):
+        key_codes = encode_key(key).astype(np.int64)
+        key_length = len(key_codes)
+        codes, columns, starts = _prepare(ciphertexts, key_length)
+        plaintext = (codes - key_codes[columns]) % ALPHABET_SIZE
+        candidates = np.arange(ALPHABET_SIZE)
+
+        # The quadgrams touching the letters of every key position, as (quadgram, letter) indices into the text
+        windows = []
+        quadgram_columns = columns[starts[:, None] + np.arange(4)]
+        for j in range(key_length):
+            affected = starts[np.any(quadgram_columns == j, axis=1)]
+            windows.append(affected[:, None] + np.arange(4))
+
+        for _ in range(max_passes):
+            count("passes")
+            changed = False
+            for j in range(key_length):
+                window = windows[j]
+                if len(window) == 0:
+                    continue
+
+                # Plaintext of the affected quadgrams for every letter of the key position
+                replaced = columns[window] == j
+                trial = np.where(replaced, (codes[window][None, :, :] - candidates[:, None, None]) % ALPHABET_SIZE,
+                                 plaintext[window][None, :, :])
+                scores = table[trial @ QUADGRAM_WEIGHTS].sum(axis=1)
+                count("positions_tried")
+                count("quadgrams_scored", trial.shape[0] * trial.shape[1])
+
+                best = int(np.argmax(scores))
+                if scores[best] > scores[key_codes[j]]:
+                    key_codes[j] = best
+                    letters = columns == j
+                    plaintext[letters] = (codes[letters] - best) % ALPHABET_SIZE
+                    changed = True
+            if not changed:
+                break
+
+    return "".join(swedish_alphabet[code] for code in key_codes)
@@ -0,0 +1,93 @@
+from .ic_engine import CipherText, KeyLengthAccumulator, closest_key_length, ic_curve
+from .language_profile import load_profile
+from .shift_solver import best_shifts, segment_histograms, shift_scores, shifts_to_key
+
+
+def friedman_test(ciphertext, swedish_ic=None, key_lengths=range(1, 17), cache=None):
+    """
+    Perform the Friedman test on a given ciphertext to estimate the key length used in a
+    monoalphabetic substitution cipher.
+
+    :param ciphertext: The ciphertext to analyze, as a string or a CipherText.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param key_lengths: The candidate key lengths (default 1 to 16).
+    :param cache: An AnalysisCache to reuse the IC of the key lengths calculated before.
+    :return: The estimated key length.
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    curve = ic_curve(ciphertext, key_lengths) if cache is None else cache.ic_curve(ciphertext, key_lengths)
+
+    # Find the key length with IC closest to the Swedish IC
+    return closest_key_length(curve, key_lengths, swedish_ic)
+
+
+def shared_friedman_test(ciphertexts, swedish_ic=None, key_lengths=range(100, 500), cache=None):
+    """
+    Perform the Friedman test on ciphertexts encrypted with the same key.
+
+    :param ciphertexts: The ciphertexts to analyze, as strings or CipherTexts.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param key_lengths: The candidate key lengths (default 100 to 499).
+    :param cache: An AnalysisCache to reuse the IC of the key lengths calculated before.
+    :return: The estimated key length.
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    if cache is not None:
+        # Merging the columns of the ciphertexts is the same as pooling them
+        curve = cache.ic_curve(ciphertexts, key_lengths, pooled=True)
+        return closest_key_length(curve, key_lengths, swedish_ic)
+
+    # The columns of all the ciphertexts are merged since they share the same key
+    accumulator = KeyLengthAccumulator(key_lengths)
+    for ciphertext in ciphertexts:
+        accumulator.add(ciphertext)
+
+    # Find the key length with IC closest to the Swedish IC
+    return accumulator.best_key_length(swedish_ic)
+
+
+def split_segments(text, key_length):
+    """
+    :param text: The ciphertext to split, as a string or a CipherText.
+    :param key_length: The length of the key.
+    :return: The segments of the text, one for every key position. The segments of a CipherText are views of its
+        codes, which every function taking a segment accepts too.
+    """
+    if isinstance(text, CipherText):
+        return text.columns(key_length)
+    return [text[i::key_length] for i in range(key_length)]
+
+
+def text_sharpener(ciphertexts, key_length):
+    """
+    :param ciphertexts: the cipher text list
+    :param key_length: key length of the cipher texts
+    The length of the texts are made to be a multiple of the key length first by removing the modulo value from the tail
+    :return: The concatenated version of the cipher texts, a CipherText if they are CipherTexts
+    """
+    if ciphertexts and all(isinstance(ciphertext, CipherText) for ciphertext in ciphertexts):
+        return CipherText.concatenate([ciphertext[:len(ciphertext) - (len(ciphertext) % key_length)]
+                                       for ciphertext in ciphertexts])
+    res = ""
+    for ciphertext in ciphertexts:
+        res += ciphertext[:len(ciphertext) - (len(ciphertext) % key_length)]
+    return res
+
+
+def calculate_shifts(segment, cache=None):
+    if cache is not None:
+        return int(best_shifts(cache.segment_scores([segment]))[0])
+    histograms = segment_histograms([segment])
+    return int(best_shifts(shift_scores(histograms))[0])
+
+
+def reconstruct_key(segment_list, cache=None):
+    # All the segments are scored at once against the Swedish letter frequencies
+    if cache is None:
+        scores = shift_scores(segment_histograms(segment_list))
+    else:
+        scores = cache.segment_scores(segment_list)
+    # Reversing the shifts to reconstruct the original key
+    return shifts_to_key(best_shifts(scores))
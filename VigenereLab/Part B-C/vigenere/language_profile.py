@@ -0,0 +1,253 @@
+import glob
+import hashlib
+import json
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from .codec import vigenere_decrypt
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, encode, ic_curve, swedish_alphabet
+from .quadgram_model import build_quadgram_table, quadgram_indices
+from .shift_solver import SWEDISH_FREQUENCIES, best_shifts, column_histograms, shift_scores, shifts_to_key
+
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIRECTORY = os.path.join(BASE_DIRECTORY, "corpus")
+PROFILE_DIRECTORY = os.path.join(BASE_DIRECTORY, "profiles")
+
+MAGIC = b"VIGPROF4"
+# Magic, then the length of the JSON header that follows
+_PREFIX = struct.Struct("<8sI")
+# The tables start at a multiple of this many bytes
+_ALIGNMENT = 64
+
+# Published letter frequencies, used instead of the corpus ones when the corpus is small
+PUBLISHED_FREQUENCIES = {"swedish": SWEDISH_FREQUENCIES}
+# Published indices of coincidence, used instead of the one measured on the corpus. The 0.0681 of the lab
+# assignment is the value the Part B key lengths were estimated with, while the small Swedish corpus measures 0.0603
+PUBLISHED_ICS = {"swedish": 0.0681}
+
+
+class LanguageProfile:
+    """
+    Letter statistics of a language: the expected IC, the letter frequencies and the log10 probabilities of
+    quadgrams. The tables of a loaded profile are read-only memory maps of the profile file, so every process
+    using the same profile shares its pages.
+    """
+
+    def __init__(self, language, ic, unigram, quadgram, fingerprint=None):
+        """
+        :param language: The name of the language.
+        :param ic: The index of coincidence of the language.
+        :param unigram: The frequency of every letter of the alphabet.
+        :param quadgram: The log10 probability of every quadgram, as in quadgram_model.
+        :param fingerprint: The profile_fingerprint of the statistics (default: calculated from them).
+        """
+        self.language = language
+        self.ic = ic
+        self.unigram = unigram
+        self.quadgram = quadgram
+        self.fingerprint = profile_fingerprint(ic, unigram, quadgram) if fingerprint is None else fingerprint
+
+    def score(self, text):
+        """
+        :param text: The text to score.
+        :return: The average log10 quadgram probability of the text, comparable between profiles.
+        """
+        codes = encode(text)
+        indices = quadgram_indices(codes[codes != INVALID_CODE])
+        if len(indices) == 0:
+            return float("-inf")
+        return float(self.quadgram[indices].mean())
+
+
+def profile_fingerprint(ic, unigram, quadgram):
+    """
+    Identify the statistics of a profile, e.g. in the cache keys of the results they produced.
+
+    :return: The first 16 hex digits of the SHA-256 digest of the IC and the tables.
+    """
+    digest = hashlib.sha256(repr(float(ic)).encode())
+    for table in (unigram, quadgram):
+        digest.update(np.ascontiguousarray(table, dtype="<f4").tobytes())
+    return digest.hexdigest()[:16]
+
+
+def build_profile(language, texts, unigram_frequencies=None, ic=None):
+    """
+    Build the profile of a language from a training corpus.
+
+    :param language: The name of the language.
+    :param texts: The training texts.
+    :param unigram_frequencies: The letter frequencies to use (default: counted from the corpus).
+    :param ic: The index of coincidence to use (default: measured on the corpus).
+    :return: A LanguageProfile holding in-memory tables.
+    """
+    letters = [codes[codes != INVALID_CODE] for codes in map(encode, texts)]
+    letter_counts = sum((np.bincount(codes, minlength=ALPHABET_SIZE) for codes in letters),
+                        np.zeros(ALPHABET_SIZE, dtype=np.int64))
+    if unigram_frequencies is None:
+        unigram_frequencies = (letter_counts + 1) / (letter_counts.sum() + ALPHABET_SIZE)
+    unigram_frequencies = np.asarray(unigram_frequencies, dtype=np.float32)
+
+    if ic is None:
+        ic = float(ic_curve("".join(texts), [1])[0])
+    quadgram = build_quadgram_table(texts, unigram_frequencies)
+    return LanguageProfile(language, ic, unigram_frequencies, quadgram)
+
+
+def save_profile(profile, path):
+    """
+    Write a profile to one binary file: a JSON header with the fingerprint and the offsets of the tables, then the
+    float32 tables. The file is written next to its destination first and then moved, so readers never see a
+    partial file.
+
+    :param profile: The profile to write.
+    :param path: The file to write.
+    """
+    tables = {"unigram": profile.unigram, "quadgram": profile.quadgram}
+    header = {"language": profile.language, "alphabet": swedish_alphabet, "ic": profile.ic,
+              "fingerprint": profile.fingerprint, "tables": {}}
+
+    # The header is laid out twice, since its length moves the offsets of the tables it lists
+    data_offset = 0
+    for _ in range(2):
+        offset = data_offset
+        for name, table in tables.items():
+            header["tables"][name] = {"offset": offset, "shape": list(table.shape)}
+            offset += -(-table.size * 4 // _ALIGNMENT) * _ALIGNMENT
+        encoded_header = json.dumps(header).encode("utf-8")
+        data_offset = -(-(_PREFIX.size + len(encoded_header)) // _ALIGNMENT) * _ALIGNMENT
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as profileWriter:
+        profileWriter.write(_PREFIX.pack(MAGIC, len(encoded_header)) + encoded_header)
+        for name, table in tables.items():
+            profileWriter.seek(header["tables"][name]["offset"])
+            profileWriter.write(np.ascontiguousarray(table, dtype="<f4").tobytes())
+        profileWriter.truncate(offset)
+    os.replace(temporary_path, path)
+
+
+def read_profile(path):
+    """
+    Memory-map a profile file. Only the header is parsed, the tables are paged in when they are used, and the
+    fingerprint is the one stored in the header.
+
+    :param path: The profile file.
+    :return: A LanguageProfile whose tables are read-only memory maps.
+    :raises ValueError: If the file is not a complete profile of the current format and alphabet.
+    """
+    with open(path, "rb") as profileReader:
+        prefix = profileReader.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is too short for a language profile")
+        magic, header_length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a language profile")
+        header = json.loads(profileReader.read(header_length).decode("utf-8"))
+        file_size = os.fstat(profileReader.fileno()).st_size
+    if header["alphabet"] != swedish_alphabet:
+        raise ValueError(f"{path} was built for the alphabet {header['alphabet']!r}")
+
+    tables = {}
+    for name, table in header["tables"].items():
+        shape = tuple(table["shape"])
+        if table["offset"] + 4 * int(np.prod(shape)) > file_size:
+            raise ValueError(f"{path} is truncated")
+        tables[name] = np.memmap(path, dtype="<f4", mode="r", offset=table["offset"], shape=shape)
+    return LanguageProfile(header["language"], header["ic"], tables["unigram"], tables["quadgram"],
+                           header["fingerprint"])
+
+
+def corpus_path(language):
+    return os.path.join(CORPUS_DIRECTORY, f"{language}.txt")
+
+
+def profile_path(language):
+    return os.path.join(PROFILE_DIRECTORY, f"{language}.vigp")
+
+
+def available_languages():
+    """
+    :return: The languages with a training corpus.
+    """
+    return sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(corpus_path("*")))
+
+
+def prebuild(language):
+    """
+    Build the profile file of a language from its corpus in CORPUS_DIRECTORY.
+
+    :param language: The name of the language.
+    :return: The path of the profile file.
+    """
+    with open(corpus_path(language), encoding="utf-8") as corpusReader:
+        texts = corpusReader.read().split()
+    path = profile_path(language)
+    save_profile(build_profile(language, texts, PUBLISHED_FREQUENCIES.get(language), PUBLISHED_ICS.get(language)), path)
+    return path
+
+
+@lru_cache(maxsize=None)
+def load_profile(language="swedish"):
+    """
+    Memory-map the profile of a language at first use, building it first if it is missing, older than its
+    corpus or written in an older format.
+
+    :param language: The name of the language.
+    :return: The LanguageProfile.
+    """
+    path = profile_path(language)
+    corpus = corpus_path(language)
+    if not os.path.exists(path) or (os.path.exists(corpus) and os.path.getmtime(corpus) > os.path.getmtime(path)):
+        prebuild(language)
+    try:
+        return read_profile(path)
+    except (ValueError, KeyError, struct.error):
+        prebuild(language)
+        return read_profile(path)
+
+
+def select_profile(ciphertext, key_length, languages=None):
+    """
+    Pick the language whose profile fits a ciphertext best.
+
+    For every language the key is reconstructed with its letter frequencies, and the plaintext is scored with
+    its quadgram table. A single candidate language is returned without scoring.
+
+    :param ciphertext: The ciphertext to analyze.
+    :param key_length: The estimated key length.
+    :param languages: The candidate languages (default: all the languages with a corpus).
+    :return: The best fitting LanguageProfile.
+    """
+    languages = languages or available_languages() or ["swedish"]
+    if len(languages) == 1:
+        return load_profile(languages[0])
+
+    histograms = column_histograms(ciphertext, key_length)
+    best_profile, best_score = None, float("-inf")
+    for language in languages:
+        profile = load_profile(language)
+        key = shifts_to_key(best_shifts(shift_scores(histograms, np.asarray(profile.unigram, dtype=np.float64))))
+        score = profile.score(vigenere_decrypt(ciphertext, key))
+        if best_profile is None or score > best_score:
+            best_profile, best_score = profile, score
+    return best_profile
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the binary language profiles from the corpora.")
+    parser.add_argument("languages", nargs="*", help="languages to build (default: all with a corpus)")
+    args = parser.parse_args()
+
+    for language in args.languages or available_languages():
+        print(f"{language}: {prebuild(language)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import numpy as np
+
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, CipherText, encode, ic_curve
+from .instrumentation import count, stage
+from .language_profile import load_profile
+
+# Fewest letter pairs a lag needs before its coincidence rate is trusted
+DEFAULT_MIN_OVERLAP = 40
+
+# The probability that two uniformly random letters coincide
+RANDOM_IC = 1 / ALPHABET_SIZE
+
+
+def coincidence_counts(ciphertext):
+    """
+    Count the coincidences of a ciphertext with itself shifted by every lag at once.
+
+    The autocorrelation of the one-hot row of every letter is calculated with an FFT, so the cost is
+    O(n log n) whatever the number of lags. The power spectra of the rows are added up one row at a time, so
+    only one row and its spectrum are in memory at once instead of the whole one-hot matrix.
+
+    :param ciphertext: The ciphertext to analyze.
+    :return: Two integer arrays of length n: the number of positions i where the letters at i and i + lag are
+        equal, and the number of positions where both are letters of the alphabet.
+    """
+    codes = encode(ciphertext)
+    n = len(codes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    size = 1 << int(2 * n - 1).bit_length()
+    power = np.zeros(size // 2 + 1)
+    for letter in np.unique(codes[codes != INVALID_CODE]).tolist():
+        spectrum = np.fft.rfft(codes == letter, size)
+        power += spectrum.real ** 2 + spectrum.imag ** 2
+    letters = np.fft.irfft(power, size)[:n]
+
+    # The autocorrelation of the letter mask counts the pairs that can coincide at all
+    spectrum = np.fft.rfft(codes != INVALID_CODE, size)
+    overlaps = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, size)[:n]
+    return np.rint(letters).astype(np.int64), np.rint(overlaps).astype(np.int64)
+
+
+def autocorrelation(ciphertexts):
+    """
+    :param ciphertexts: A ciphertext or a list of ciphertexts encrypted with the same key from its first position.
+    :return: The coincidence and overlap counts of every lag, summed over the ciphertexts.
+    """
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+    counts = [coincidence_counts(ciphertext) for ciphertext in ciphertexts]
+    length = max((len(coincidences) for coincidences, _ in counts), default=0)
+
+    coincidences = np.zeros(length, dtype=np.int64)
+    overlaps = np.zeros(length, dtype=np.int64)
+    for text_coincidences, text_overlaps in counts:
+        coincidences[:len(text_coincidences)] += text_coincidences
+        overlaps[:len(text_overlaps)] += text_overlaps
+    return coincidences, overlaps
+
+
+def _log_likelihood_ratios(coincidences, pairs, swedish_ic=None):
+    """
+    Log-likelihood ratio of the letter pairs coinciding at the rate of Swedish rather than of random letters.
+
+    Unlike a z-score against random letters, a short run of repeated plaintext with a far too high coincidence
+    rate does not outweigh thousands of pairs at the expected rate. swedish_ic defaults to the one of the Swedish
+    profile.
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    return coincidences * np.log(swedish_ic / RANDOM_IC) + \
+        (pairs - coincidences) * np.log((1 - swedish_ic) / (1 - RANDOM_IC))
+
+
+def period_statistics(coincidences, overlaps, max_period=None, min_overlap=DEFAULT_MIN_OVERLAP, swedish_ic=None):
+    """
+    Calculate the coincidence rate of every candidate period over all the lags that are multiples of it.
+
+    Letters a multiple of the key period apart were encrypted with the same key letter, so their coincidence
+    rate is close to the IC of the language, while other lags stay near random. The true period collects the
+    lags of all its multiples, so it gets a higher score than the multiples themselves, and its divisors are
+    held down by the lags in between that stay random.
+
+    :param coincidences: The coincidence count of every lag.
+    :param overlaps: The overlap count of every lag.
+    :param max_period: The longest period (default: the longest lag with enough overlap).
+    :param min_overlap: The fewest letter pairs a lag needs to be used.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :return: Two arrays where [period] is the coincidence rate and its log-likelihood ratio of Swedish against
+        random letters, NaN for the periods not tested.
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    usable_lags = np.flatnonzero(overlaps >= min_overlap)
+    usable_lags = usable_lags[usable_lags > 0]
+    if len(usable_lags) == 0:
+        return np.full(1, np.nan), np.full(1, np.nan)
+    max_lag = int(usable_lags[-1])
+    max_period = max_lag if max_period is None else min(max_period, max_lag)
+
+    # Every multiple of every period up to max_lag, grouped by period
+    periods = np.arange(1, max_period + 1)
+    multiples = max_lag // periods
+    period_ids = np.repeat(periods, multiples)
+    steps = np.arange(len(period_ids)) - np.repeat(np.cumsum(multiples) - multiples, multiples) + 1
+    lags = period_ids * steps
+
+    usable = overlaps[lags] >= min_overlap
+    coincidence_sums = np.bincount(period_ids[usable], weights=coincidences[lags[usable]], minlength=max_period + 1)
+    overlap_sums = np.bincount(period_ids[usable], weights=overlaps[lags[usable]], minlength=max_period + 1)
+
+    rates = np.full(max_period + 1, np.nan)
+    scores = np.full(max_period + 1, np.nan)
+    tested = overlap_sums > 0
+    tested[0] = False
+    rates[tested] = coincidence_sums[tested] / overlap_sums[tested]
+    scores[tested] = _log_likelihood_ratios(coincidence_sums[tested], overlap_sums[tested], swedish_ic)
+    return rates, scores
+
+
+def rank_periods(ciphertexts, max_period=None, candidates=20, swedish_ic=None, min_overlap=DEFAULT_MIN_OVERLAP):
+    """
+    Rank the key periods by combining the FFT autocorrelation with the Friedman test.
+
+    The autocorrelation is calculated for every period up to max_period, and the Friedman test is only run on
+    the best candidates, so the whole range of periods can be searched without choosing a window by hand.
+    Both signals are turned into log-likelihood ratios of Swedish against random letters and averaged.
+
+    :param ciphertexts: A ciphertext or a list of ciphertexts encrypted with the same key from its first position.
+    :param max_period: The longest period (default: as long as the text allows).
+    :param candidates: The number of periods passed from the autocorrelation to the Friedman test.
+    :param swedish_ic: The index of coincidence for Swedish language (default: the one of the Swedish profile).
+    :param min_overlap: The fewest letter pairs a lag needs to be used.
+    :return: A list of (period, score, autocorrelation rate, average column IC) tuples, the best period first.
+        The score is the mean of the two log-likelihood ratios, higher is better.
+    """
+    if swedish_ic is None:
+        swedish_ic = load_profile().ic
+    pooled = not isinstance(ciphertexts, (str, CipherText))
+    texts = ciphertexts if pooled else [ciphertexts]
+    with stage("rank_periods", texts=len(texts), characters=sum(map(len, texts))):
+        rates, scores = period_statistics(*autocorrelation(texts), max_period, min_overlap, swedish_ic)
+
+        tested = np.flatnonzero(~np.isnan(scores))
+        count("candidate_lengths", len(tested))
+        shortlist = tested[np.argsort(-scores[tested], kind="stable")[:candidates]]
+        if len(shortlist) == 0:
+            return []
+
+        # Letter pairs in the same column, needed to turn the average column IC into a coincidence count
+        letter_counts = np.array([np.count_nonzero(encode(text) != INVALID_CODE) for text in texts])
+        column_sizes = letter_counts[None, :] / shortlist[:, None]
+        pairs = shortlist * (column_sizes * (column_sizes - 1) / 2).sum(axis=1)
+
+        column_ics = ic_curve(texts, shortlist, pooled=True)
+        friedman_scores = _log_likelihood_ratios(column_ics * pairs, pairs, swedish_ic)
+
+        ranking = []
+        for period, score, friedman_score, rate, column_ic in zip(
+                shortlist, scores[shortlist], friedman_scores, rates[shortlist], column_ics):
+            if np.isnan(friedman_score):
+                continue
+            ranking.append((int(period), float((score + friedman_score) / 2), float(rate), float(column_ic)))
+        ranking.sort(key=lambda candidate: (-candidate[1], candidate[0]))
+        return ranking
@@ -0,0 +1,44 @@
+import numpy as np
+
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, encode
+from .shift_solver import SWEDISH_FREQUENCIES
+
+QUADGRAM_COUNT = ALPHABET_SIZE ** 4
+
+# Weights turning four alphabet indices into the index of their quadgram
+QUADGRAM_WEIGHTS = ALPHABET_SIZE ** np.arange(3, -1, -1)
+
+
+def quadgram_indices(codes):
+    """
+    :param codes: Alphabet indices of a text without characters outside the alphabet.
+    :return: The index of every quadgram of the text.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    if len(codes) < 4:
+        return np.empty(0, dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(codes, 4)
+    return windows @ QUADGRAM_WEIGHTS
+
+
+def build_quadgram_table(texts, unigram_frequencies=SWEDISH_FREQUENCIES, smoothing=0.1):
+    """
+    Build the log10 probability of every quadgram from a training corpus.
+
+    The quadgram frequencies of the corpus are mixed with the probability of the four letters occurring
+    independently, so quadgrams that do not occur in a small corpus are still ordered by how common their letters are.
+
+    :param texts: The training texts.
+    :param unigram_frequencies: The frequency of every letter of the alphabet.
+    :param smoothing: The weight of the independent letter probabilities.
+    :return: A float32 array of length ALPHABET_SIZE ** 4.
+    """
+    counts = np.zeros(QUADGRAM_COUNT, dtype=np.int64)
+    for text in texts:
+        codes = encode(text)
+        codes = codes[codes != INVALID_CODE]
+        counts += np.bincount(quadgram_indices(codes), minlength=QUADGRAM_COUNT)
+
+    independent = np.einsum("a,b,c,d->abcd", *([unigram_frequencies] * 4)).ravel()
+    probabilities = (1 - smoothing) * counts / max(1, counts.sum()) + smoothing * independent
+    return np.log10(probabilities).astype(np.float32)
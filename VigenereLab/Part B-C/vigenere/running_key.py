@@ -0,0 +1,118 @@
+import numpy as np
+
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, CipherText, encode, swedish_alphabet
+from .instrumentation import count, stage
+from .language_profile import load_profile
+from .quadgram_model import QUADGRAM_WEIGHTS, quadgram_indices
+from .shift_solver import SWEDISH_FREQUENCIES
+
+# Log10 letter probabilities, used for the first key positions where no quadgram is complete yet
+UNIGRAM_SCORES = np.log10(SWEDISH_FREQUENCIES)
+
+# Number of finished beams rescored over the whole texts before picking the key
+FINAL_CANDIDATES = 50
+
+
+def _key_rows(ciphertexts, key_length):
+    """
+    Lay the ciphertexts out as rows of key_length letters, each row encrypted with the whole key.
+
+    :return: An array of shape (number of rows, key_length), -1 where a row has no letter.
+    """
+    rows = []
+    for ciphertext in ciphertexts:
+        codes = encode(ciphertext).astype(np.int64)
+        codes[codes == INVALID_CODE] = -1
+        padded = np.full(-(-len(codes) // key_length) * key_length, -1, dtype=np.int64)
+        padded[:len(codes)] = codes
+        rows.append(padded.reshape(-1, key_length))
+    return np.concatenate(rows)
+
+
+def _total_score(ciphertexts, key, table):
+    """
+    Quadgram score of the key and of every plaintext it gives.
+    """
+    key_codes = encode(key).astype(np.int64)
+    score = table[quadgram_indices(key_codes)].sum()
+    for ciphertext in ciphertexts:
+        codes = encode(ciphertext).astype(np.int64)
+        positions = np.flatnonzero(codes != INVALID_CODE)
+        plaintext = (codes[positions] - key_codes[positions % len(key_codes)]) % ALPHABET_SIZE
+        score += table[quadgram_indices(plaintext)].sum()
+    return float(score)
+
+
+def running_key_decode(ciphertexts, key_length, beam_width=256, table=None):
+    """
+    Recover a key that is itself Swedish text by decoding the key and the plaintexts together.
+
+    The key is decoded from left to right. Every partial key is scored with the quadgram model both as text
+    and through the plaintexts it gives in all the ciphertexts at once, and only the beam_width best are kept.
+    Partial keys ending in the same three letters are scored the same from then on, so only the best of them
+    is kept. Time and memory grow linearly with the key length.
+
+    :param ciphertexts: The ciphertexts encrypted with the same key from its first position, e.g. the ones passed
+        to text_sharpener.
+    :param key_length: The length of the key.
+    :param beam_width: The number of partial keys kept after every key position.
+    :param table: A quadgram table (default: the one of the Swedish profile).
+    :return: The key.
+    """
+    if isinstance(ciphertexts, (str, CipherText)):
+        ciphertexts = [ciphertexts]
+    table = load_profile().quadgram if table is None else table
+
+    with stage("running_key_decode", texts=len(ciphertexts), key_length=key_length, beam_width=beam_width):
+        rows = _key_rows(ciphertexts, key_length)
+        present = rows >= 0
+        candidates = np.arange(ALPHABET_SIZE)
+
+        scores = np.zeros(1)
+        history = np.zeros((1, 3), dtype=np.int64)
+        parents, letters = [], []
+
+        for t in range(key_length):
+            column, column_present = rows[:, t], present[:, t]
+            # plaintext[k, r] is the plaintext letter of row r at this position with key letter k
+            plaintext = (column[None, :] - candidates[:, None]) % ALPHABET_SIZE
+
+            if t < 3:
+                key_scores = np.broadcast_to(UNIGRAM_SCORES, (len(scores), ALPHABET_SIZE))
+                plaintext_scores = np.where(column_present, UNIGRAM_SCORES[plaintext], 0).sum(axis=1)[None, :]
+            else:
+                key_indices = history @ QUADGRAM_WEIGHTS[:3]
+                key_scores = table[key_indices[:, None] + candidates[None, :]]
+
+                # The three previous plaintext letters of every row under every partial key
+                previous = (rows[None, :, t - 3:t] - history[:, None, :]) % ALPHABET_SIZE
+                previous_indices = previous @ QUADGRAM_WEIGHTS[:3]
+                usable = present[:, t - 3:t + 1].all(axis=1)
+                quadgrams = table[previous_indices[:, None, :] + plaintext[None, :, :]]
+                plaintext_scores = np.where(usable, quadgrams, 0).sum(axis=2)
+
+            totals = (scores[:, None] + key_scores + plaintext_scores).ravel()
+            count("partial_keys_scored", len(totals))
+            parent_ids = np.repeat(np.arange(len(scores)), ALPHABET_SIZE)
+            new_letters = np.tile(candidates, len(scores))
+            states = history[parent_ids, 1] * ALPHABET_SIZE ** 2 + history[parent_ids, 2] * ALPHABET_SIZE + new_letters
+
+            # Keeping the best partial key of every three-letter state, then the best beam_width of those
+            order = np.argsort(-totals, kind="stable")
+            _, first = np.unique(states[order], return_index=True)
+            kept = order[np.sort(first)][:beam_width]
+
+            scores = totals[kept]
+            history = np.column_stack((history[parent_ids[kept], 1:], new_letters[kept]))
+            parents.append(parent_ids[kept])
+            letters.append(new_letters[kept])
+
+        # Following the back pointers of the best beams and rescoring them over the whole texts
+        keys = []
+        for beam in range(min(FINAL_CANDIDATES, len(scores))):
+            key_codes = []
+            for t in range(key_length - 1, -1, -1):
+                key_codes.append(letters[t][beam])
+                beam = parents[t][beam]
+            keys.append("".join(swedish_alphabet[code] for code in reversed(key_codes)))
+        return max(keys, key=lambda key: _total_score(ciphertexts, key, table))
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import math
+import socket
+
+from .batch_crack import crack_batch
+from .ic_engine import CipherText
+from .instrumentation import count, stage
+from .language_profile import load_profile
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8029
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_LATENCY = 0.005
+DEFAULT_MAX_PENDING = 256
+DEFAULT_MAX_KEY_LENGTH = 1000
+
+# Longest request line accepted, in bytes
+MAX_REQUEST_BYTES = 1 << 24
+
+
+def parse_request(line, max_key_length=DEFAULT_MAX_KEY_LENGTH):
+    """
+    Read one request of the line protocol of the service.
+
+    A request is a JSON object on one line with a "ciphertext" string, and optionally an "id" echoed in the
+    response, "min_length" and "max_length" (default 1 and 16), "swedish_ic" (default: the one of the Swedish
+    profile) and "refine" (default true).
+
+    :param line: The request line.
+    :param max_key_length: The largest max_length accepted.
+    :return: The request as a dict with all the fields, the ciphertext encoded as a CipherText.
+    """
+    request = json.loads(line)
+    if not isinstance(request, dict) or not isinstance(request.get("ciphertext"), str):
+        raise ValueError('A request must be a JSON object with a "ciphertext" string')
+    min_length = int(request.get("min_length", 1))
+    max_length = int(request.get("max_length", 16))
+    if not 1 <= min_length <= max_length:
+        raise ValueError("The key lengths must satisfy 1 <= min_length <= max_length")
+    if max_length > max_key_length:
+        raise ValueError(f"The max_length must be at most {max_key_length}")
+    swedish_ic = None if request.get("swedish_ic") is None else float(request["swedish_ic"])
+    if swedish_ic is not None and not (math.isfinite(swedish_ic) and 0 < swedish_ic <= 1):
+        raise ValueError("The swedish_ic must be a number between 0 and 1")
+    # Encoded here, a ciphertext that is not valid Unicode, e.g. with a lone surrogate, is rejected on its own
+    # instead of failing the batch it would join
+    try:
+        ciphertext = CipherText(request["ciphertext"])
+    except UnicodeError:
+        raise ValueError("The ciphertext must be valid Unicode text") from None
+    return {
+        "id": request.get("id"),
+        "ciphertext": ciphertext,
+        "min_length": min_length,
+        "max_length": max_length,
+        "swedish_ic": swedish_ic,
+        "refine": bool(request.get("refine", True)),
+    }
+
+
+def request_id(line):
+    """
+    :param line: A request line, valid or not.
+    :return: The "id" of the request, or None if the line is not a JSON object.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return request.get("id") if isinstance(request, dict) else None
+
+
+def crack_requests(requests):
+    """
+    Break a micro-batch of requests, with one crack_batch call for every set of parameters in it.
+
+    If the crack_batch call of a set of parameters raises an exception, its requests are retried one at a time, so
+    one bad request only fails itself and not the others batched with it.
+
+    :param requests: Requests returned by parse_request.
+    :return: The record or the exception of every request, in order.
+    """
+    groups = {}
+    for i, request in enumerate(requests):
+        parameters = (request["min_length"], request["max_length"], request["swedish_ic"], request["refine"])
+        groups.setdefault(parameters, []).append(i)
+
+    results = [None] * len(requests)
+    with stage("service_batch", requests=len(requests)):
+        count("parameter_groups", len(groups))
+        for (min_length, max_length, swedish_ic, refine), indices in groups.items():
+            key_lengths = range(min_length, max_length + 1)
+            try:
+                records = crack_batch([requests[i]["ciphertext"] for i in indices], key_lengths, swedish_ic, refine)
+            except Exception:
+                count("failed_groups")
+                records = [_crack_one(requests[i]["ciphertext"], key_lengths, swedish_ic, refine) for i in indices]
+            for i, record in zip(indices, records):
+                results[i] = record
+    return results
+
+
+def _crack_one(ciphertext, key_lengths, swedish_ic, refine):
+    try:
+        return crack_batch([ciphertext], key_lengths, swedish_ic, refine)[0]
+    except Exception as error:
+        return error
+
+
+class MicroBatcher:
+    """
+    Groups the items submitted by concurrent clients into batches processed by one call.
+
+    A batch is closed when it holds batch_size items or max_latency seconds after its first item arrived,
+    whichever comes first, and is processed on a worker thread so the event loop keeps accepting requests. At
+    most max_pending items wait in the queue: submit blocks when it is full, which stops reading from the client
+    connections until the batches catch up.
+    """
+
+    def __init__(self, process, batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY,
+                 max_pending=DEFAULT_MAX_PENDING):
+        """
+        :param process: A function taking a list of items and returning the list of their results, where a result
+            that is an exception is raised to the submitter.
+        :param batch_size: The largest number of items in a batch.
+        :param max_latency: The longest time in seconds a batch waits for more items.
+        :param max_pending: The largest number of items waiting for a batch.
+        """
+        self.process = process
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.queue = asyncio.Queue(max_pending)
+        self.batch_count = 0
+        self.item_count = 0
+
+    async def submit(self, item):
+        """
+        Queue an item, waiting while the queue is full.
+
+        :param item: The item to process.
+        :return: A future of its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        """
+        Process batches until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.batch_count += 1
+            self.item_count += len(batch)
+            try:
+                results = await loop.run_in_executor(None, self.process, [item for item, _ in batch])
+            except Exception as error:
+                results = [error] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class CrackingService:
+    """
+    A long-running cracking service speaking a JSON lines protocol over TCP or a Unix socket.
+
+    Every line a client sends is a request, see parse_request, and is answered by one line with its "id" and the
+    fields returned by crack, or an "error". A client may send many requests without waiting, and the responses
+    come back in the order they are finished. The language profile is loaded once when the service starts.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY,
+                 max_pending=DEFAULT_MAX_PENDING, max_key_length=DEFAULT_MAX_KEY_LENGTH):
+        """
+        :param batch_size: The largest number of requests cracked together.
+        :param max_latency: The longest time in seconds a request waits for others to join its batch.
+        :param max_pending: The largest number of requests waiting for a batch before clients are slowed down.
+        :param max_key_length: The largest max_length a request may ask for.
+        """
+        self.batcher = MicroBatcher(crack_requests, batch_size, max_latency, max_pending)
+        self.max_key_length = max_key_length
+
+    async def _respond(self, writer, lock, response):
+        async with lock:
+            writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def _answer(self, writer, lock, request_id, future):
+        try:
+            response = {"id": request_id, **await future}
+        except Exception as error:
+            response = {"id": request_id, "error": str(error)}
+        await self._respond(writer, lock, response)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve the requests of one client connection.
+        """
+        lock = asyncio.Lock()
+        answers = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await self._respond(writer, lock, {"id": None, "error": "The request line is too long"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = parse_request(line, self.max_key_length)
+                except (ValueError, TypeError) as error:
+                    await self._respond(writer, lock, {"id": request_id(line), "error": str(error)})
+                    continue
+
+                future = await self.batcher.submit(request)
+                answer = asyncio.create_task(self._answer(writer, lock, request["id"], future))
+                answers.add(answer)
+                answer.add_done_callback(answers.discard)
+            await asyncio.gather(*answers)
+        except ConnectionError:
+            pass
+        finally:
+            for answer in answers:
+                answer.cancel()
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, ready=None):
+        """
+        Load the language profile and serve until cancelled.
+
+        :param host: The address to listen on.
+        :param port: The TCP port to listen on.
+        :param unix_path: A Unix socket path to listen on instead of TCP.
+        :param ready: An asyncio.Event set once the service accepts connections.
+        """
+        # Loading the profile here and reading through its quadgram table keeps the pages of every table warm
+        profile = load_profile()
+        float(profile.quadgram.sum())
+
+        if unix_path is None:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_REQUEST_BYTES)
+        else:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path, limit=MAX_REQUEST_BYTES)
+        batches = asyncio.create_task(self.batcher.run())
+        try:
+            async with server:
+                if ready is not None:
+                    ready.set()
+                await server.serve_forever()
+        finally:
+            batches.cancel()
+
+
+def crack_remote(ciphertexts, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, **parameters):
+    """
+    Send ciphertexts to a running service and wait for all the responses.
+
+    :param ciphertexts: The ciphertexts to break.
+    :param host: The address of the service.
+    :param port: The TCP port of the service.
+    :param unix_path: The Unix socket of the service, instead of TCP.
+    :param parameters: Request fields used for every ciphertext, e.g. max_length=20.
+    :return: The responses, in the order of the ciphertexts. A request the service rejected or never answered has
+        an "error" field instead of the results.
+    """
+    if unix_path is None:
+        connection = socket.create_connection((host, port))
+    else:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(unix_path)
+
+    with connection, connection.makefile("rwb") as stream:
+        for i, ciphertext in enumerate(ciphertexts):
+            stream.write(json.dumps({**parameters, "id": i, "ciphertext": ciphertext}).encode("utf-8") + b"\n")
+        stream.flush()
+        responses = [None] * len(ciphertexts)
+        # The error of a response that could not be matched to its request, e.g. a line too long for the service
+        unmatched_error = "The service closed the connection before answering"
+        for _ in ciphertexts:
+            line = stream.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            if isinstance(response.get("id"), int) and 0 <= response["id"] < len(responses):
+                responses[response["id"]] = response
+            else:
+                unmatched_error = response.get("error", unmatched_error)
+    return [{"id": i, "error": unmatched_error} if response is None else response
+            for i, response in enumerate(responses)]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve cracking requests, batching the concurrent ones together.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default {DEFAULT_PORT})")
+    parser.add_argument("--unix", default=None, help="Unix socket path to listen on instead of TCP")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"most requests cracked together (default {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--max-latency-ms", type=float, default=DEFAULT_MAX_LATENCY * 1000,
+                        help=f"longest wait for a batch to fill up (default {DEFAULT_MAX_LATENCY * 1000:g} ms)")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help=f"most queued requests before clients are slowed down (default {DEFAULT_MAX_PENDING})")
+    parser.add_argument("--max-key-length", type=int, default=DEFAULT_MAX_KEY_LENGTH,
+                        help=f"largest max_length a request may ask for (default {DEFAULT_MAX_KEY_LENGTH})")
+    args = parser.parse_args()
+
+    service = CrackingService(args.batch_size, args.max_latency_ms / 1000, args.max_pending, args.max_key_length)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+
+from .ic_engine import ALPHABET_SIZE, INVALID_CODE, encode, swedish_alphabet
+from .instrumentation import count, stage
+
+# The expected frequencies of letters in the Swedish language
+unnormalized_Swedish_Frequency = {"a": 10.04, "b": 1.31, "c": 1.71, "d": 4.90, "e": 9.85, "f": 1.81, "g": 3.44, "h": 2.85,
+                                  "i": 5.01, "j": 0.9, "k": 3.24, "l": 4.81, "m": 3.55, "n": 8.45, "o": 4.06, "p": 1.57,
+                                  "q": 0.01, "r": 7.88, "s": 5.32, "t": 8.89, "u": 1.86, "v": 2.55, "w": 0.09, "x": 0.11,
+                                  "y": 0.49, "z": 0.04, "å": 1.66, "ä": 2.1, "ö": 1.5}
+
+SWEDISH_FREQUENCIES = np.array([unnormalized_Swedish_Frequency[letter] for letter in swedish_alphabet])
+SWEDISH_FREQUENCIES /= SWEDISH_FREQUENCIES.sum()
+
+# ROTATIONS[shift, j] is the letter that becomes letter j when shifted forward by shift
+ROTATIONS = (np.arange(ALPHABET_SIZE)[None, :] - np.arange(ALPHABET_SIZE)[:, None]) % ALPHABET_SIZE
+
+
+def segment_histograms(segment_list):
+    """
+    Count the letters of every segment.
+
+    :param segment_list: The segments of the ciphertext, one for every key position, as strings or as columns of a
+        CipherText.
+    :return: An array of shape (number of segments, ALPHABET_SIZE).
+    """
+    histograms = np.zeros((len(segment_list), ALPHABET_SIZE), dtype=np.int64)
+    for i, segment in enumerate(segment_list):
+        codes = encode(segment)
+        histograms[i] = np.bincount(codes[codes != INVALID_CODE], minlength=ALPHABET_SIZE)
+    return histograms
+
+
+def column_histograms(ciphertext, key_length):
+    """
+    Count the letters of every column of a ciphertext without splitting it into segments.
+
+    :param ciphertext: The ciphertext to analyze.
+    :param key_length: The length of the key.
+    :return: An array of shape (key_length, ALPHABET_SIZE).
+    """
+    codes = encode(ciphertext)
+    positions = np.flatnonzero(codes != INVALID_CODE)
+    bins = (positions % key_length) * ALPHABET_SIZE + codes[positions]
+    return np.bincount(bins, minlength=key_length * ALPHABET_SIZE).reshape(key_length, ALPHABET_SIZE)
+
+
+def shift_scores(histograms, expected_frequencies=SWEDISH_FREQUENCIES):
+    """
+    Calculate the chi-square statistic of every shift of every column at once.
+
+    Shifting a column only rotates its histogram, so the shifted histograms are gathered with ROTATIONS and
+    compared to the expected counts without shifting any text.
+
+    :param histograms: Letter counts of shape (number of columns, ALPHABET_SIZE), or of a single column.
+    :param expected_frequencies: The expected frequency of every letter of the alphabet.
+    :return: An array of shape (number of columns, ALPHABET_SIZE) where [i, shift] is the chi-square statistic of
+        column i shifted forward by shift. Columns without letters get NaN.
+    """
+    histograms = np.atleast_2d(histograms)
+    with stage("shift_scores", columns=len(histograms)):
+        count("shifts_scored", histograms.shape[0] * ALPHABET_SIZE)
+        totals = histograms.sum(axis=1)
+        expected = totals[:, None, None] * expected_frequencies[None, None, :]
+
+        observed = histograms[:, ROTATIONS]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return ((observed - expected) ** 2 / expected).sum(axis=2)
+
+
+def best_shifts(scores):
+    """
+    :param scores: The score matrix returned by shift_scores.
+    :return: The shift with the lowest chi-square statistic for every column, 0 for columns without letters.
+    """
+    scores = np.where(np.isnan(scores), np.inf, scores)
+    return np.argmin(scores, axis=1)
+
+
+def shifts_to_key(shifts):
+    """
+    Reverse the shifts to reconstruct the original key.
+
+    :param shifts: The best shift of every column.
+    :return: The key.
+    """
+    return "".join(swedish_alphabet[-shift % ALPHABET_SIZE] for shift in shifts)